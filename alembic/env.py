@@ -11,6 +11,11 @@ from app.core.config import settings
 from app.models.user import User
 from app.models.collection import Collection
 from app.models.cooperative import Cooperative
+from app.models.revoked_token import RevokedToken
+from app.models.idempotency_key import IdempotencyKey
+from app.models.tombstone import Tombstone
+from app.models.job import Job
+from app.models.collection_slot import CollectionSlot
 
 # this is the Alembic Config object, which provides
 # access to the values within the .ini file in use.
@@ -1,8 +1,11 @@
 from fastapi import APIRouter
-from app.api.api_v1.endpoints import users, auth, collections, cooperatives
+from app.api.api_v1.endpoints import users, auth, collections, cooperatives, sync, jobs, addresses
 
 api_router = APIRouter()
 api_router.include_router(auth.router, prefix="/auth", tags=["auth"])
 api_router.include_router(users.router, prefix="/users", tags=["users"])
 api_router.include_router(collections.router, prefix="/collections", tags=["collections"])
 api_router.include_router(cooperatives.router, prefix="/cooperatives", tags=["cooperatives"])
+api_router.include_router(sync.router, prefix="/sync", tags=["sync"])
+api_router.include_router(jobs.router, prefix="/jobs", tags=["jobs"])
+api_router.include_router(addresses.router, prefix="/addresses", tags=["addresses"])
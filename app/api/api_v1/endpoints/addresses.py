@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from app.api.deps import get_current_user
+from app.models.user import User
+from app.schemas.address import AddressMatchMetrics
+from app.utils.addresses import address_index
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=AddressMatchMetrics)
+def address_metrics(current_user: User = Depends(get_current_user)):
+    """
+    Retorna métricas do índice de endereços usado para reaproveitar geocodificações.
+
+    - `lookups`, `exact_matches`, `fuzzy_matches`, `misses` e `match_rate`: consultas feitas por
+      este processo desde a inicialização e quantas reaproveitaram coordenadas conhecidas (apenas
+      as perdas chamam o geocodificador externo).
+    - `duplicates`: endereços geocodificados equivalentes a outro já conhecido (a mesma localização
+      grafada de outra forma).
+    - `conflicts`: duplicados cujas coordenadas estão a mais de `ADDRESS_CONFLICT_METERS` metros das
+      do endereço equivalente, indício de geocodificação de baixa qualidade.
+    """
+    return address_index.metrics()
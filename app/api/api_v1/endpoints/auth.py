@@ -1,11 +1,21 @@
+from typing import Optional
 from fastapi import APIRouter, Depends, HTTPException, status
-from pydantic import BaseModel
+from pydantic import BaseModel, ValidationError
 from fastapi.security import OAuth2PasswordRequestForm
 from sqlalchemy.orm import Session
+from app.api.deps import get_token_payload, rate_limit
 from app.core.database import get_db
-from app.core.security import create_access_token
+from app.core.revocation import revocation_list
+from app.core.security import (
+    REFRESH_TOKEN_TYPE,
+    InvalidTokenError,
+    create_access_token,
+    create_refresh_token,
+    decode_token,
+)
 from app.crud import crud_user
-from app.schemas.token import TokenWithUserDetails
+from app.models.user import User
+from app.schemas.token import Token, TokenPayload, TokenWithUserDetails
 
 router = APIRouter()
 
@@ -15,7 +25,30 @@ class LoginRequest(BaseModel):
     password: str
 
 
-@router.post("/login", response_model=TokenWithUserDetails)
+class RefreshRequest(BaseModel):
+    refresh_token: str
+
+
+class LogoutRequest(BaseModel):
+    refresh_token: Optional[str] = None
+
+
+def _decode_refresh_token(refresh_token: str) -> TokenPayload:
+    try:
+        token_data = TokenPayload(**decode_token(refresh_token))
+    except (InvalidTokenError, ValidationError):
+        token_data = None
+    if token_data is None or token_data.type != REFRESH_TOKEN_TYPE or not token_data.jti:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return token_data
+
+
+@router.post("/login", response_model=TokenWithUserDetails,
+             dependencies=[Depends(rate_limit("login", capacity=10, period=60))])
 def login(
         form_data: LoginRequest,
         db: Session = Depends(get_db)
@@ -42,7 +75,8 @@ def login(
 
    Retorna:
        - Um dicionário contendo:
-         - `access_token`: O token de acesso JWT gerado.
+         - `access_token`: O token de acesso JWT gerado (curta duração).
+         - `refresh_token`: Token usado em `POST /auth/refresh` para obter um novo par de tokens.
          - `token_type`: Sempre "bearer".
          - `type`: O tipo do usuário (ex.: administrador, cliente, etc.).
          - `name`: O nome do usuário.
@@ -64,6 +98,7 @@ def login(
    Resposta:
    {
        "access_token": "eyJhbGciOiJIUzI1NiIsInR...",
+       "refresh_token": "eyJhbGciOiJIUzI1NiIsInR...",
        "token_type": "bearer",
        "type": "user",
        "name": "João Silva",
@@ -82,5 +117,66 @@ def login(
             headers={"WWW-Authenticate": "Bearer"},
         )
     access_token = create_access_token(subject=user.id)
-    return {"access_token": access_token, "token_type": "bearer", "type": user.type, "name": user.name,
-            "email": user.email, "document": user.document}
+    refresh_token = create_refresh_token(subject=user.id)
+    return {"access_token": access_token, "refresh_token": refresh_token, "token_type": "bearer",
+            "type": user.type, "name": user.name, "email": user.email, "document": user.document}
+
+
+@router.post("/refresh", response_model=Token,
+             dependencies=[Depends(rate_limit("refresh", capacity=30, period=60))])
+def refresh(
+        form_data: RefreshRequest,
+        db: Session = Depends(get_db)
+):
+    """
+    Troca um refresh token válido por um novo par de tokens.
+
+    O refresh token utilizado é revogado (rotação), de modo que cada refresh token só pode ser
+    usado uma vez, mesmo com requisições simultâneas em processos diferentes.
+
+    Exceções:
+        - HTTP 401: Refresh token inválido, expirado, revogado ou usuário inexistente.
+    """
+    token_data = _decode_refresh_token(form_data.refresh_token)
+    revocation_list.maybe_sync(db)
+    if revocation_list.is_revoked(token_data.jti):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    user = db.query(User).filter(User.id == token_data.sub).first()
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    # A revogação no banco é a verificação definitiva: se outra requisição (neste ou em outro
+    # processo) já usou este refresh token, apenas ela recebe o novo par
+    if not revocation_list.revoke(db, token_data.jti, token_data.exp):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid refresh token",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return {"access_token": create_access_token(subject=user.id),
+            "refresh_token": create_refresh_token(subject=user.id),
+            "token_type": "bearer"}
+
+
+@router.post("/logout", status_code=204)
+def logout(
+        form_data: Optional[LogoutRequest] = None,
+        db: Session = Depends(get_db),
+        token_data: TokenPayload = Depends(get_token_payload)
+):
+    """
+    Revoga o token de acesso atual e, se informado, o refresh token da sessão.
+    """
+    if token_data.jti:
+        revocation_list.revoke(db, token_data.jti, token_data.exp)
+    if form_data and form_data.refresh_token:
+        refresh_data = _decode_refresh_token(form_data.refresh_token)
+        if refresh_data.sub == token_data.sub:
+            revocation_list.revoke(db, refresh_data.jti, refresh_data.exp)
@@ -1,22 +1,34 @@
-from typing import List
-from fastapi import APIRouter, Depends, HTTPException, status
+import math
+from datetime import date, datetime, timedelta
+from typing import List, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, status
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.idempotency import idempotency_store
+from app.crud import crud_slot
+from app.jobs.queue import enqueue
 from app.models.collection import Collection, CollectionStatus
-from app.schemas.collection import CollectionCreate, CollectionUpdate, Collection as CollectionSchema
-from app.api.deps import get_current_user
+from app.core.config import settings
+from app.schemas.collection import (
+    CollectionCreate, CollectionUpdate, Collection as CollectionSchema, Heatmap, SlotAvailability
+)
+from app.api.deps import get_current_user, rate_limit
 from app.models.user import User
-from app.utils.geocoding import get_lat_long_from_address
+from app.utils.addresses import geocode
+from app.utils.heatmap import aggregate, cell_size_for, collection_snapshot
+from app.utils.slots import day_slots, parse_time_window, zone_for
 
 router = APIRouter()
 
 
-@router.post("/", response_model=CollectionSchema)
+@router.post("/", response_model=CollectionSchema,
+             dependencies=[Depends(rate_limit("create_collection", capacity=20, period=60, per_user=True))])
 def create_collection(
         *,
         db: Session = Depends(get_db),
         collection_in: CollectionCreate,
-        current_user: User = Depends(get_current_user)
+        current_user: User = Depends(get_current_user),
+        idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")
 ):
     """
     Cria uma nova coleção associada ao usuário autenticado.
@@ -29,19 +41,32 @@ def create_collection(
     - `collection_in`: Dados da coleção a ser criada, incluindo endereço, materiais, etc.
     - `db`: Sessão do banco de dados, injetada automaticamente.
     - `current_user`: O usuário autenticado, obtido a partir do token JWT.
+    - `Idempotency-Key` (header, opcional): Identificador único da tentativa. Repetições com a
+      mesma chave devolvem a resposta original sem geocodificar nem criar outra coleção.
 
     Fluxo:
     1. O endereço fornecido na entrada é usado para obter as coordenadas geográficas (latitude e longitude).
+       Se o endereço equivaler a um já geocodificado (mesmo com grafia diferente), as coordenadas
+       conhecidas são reaproveitadas sem consultar o geocodificador externo.
+       Com `GEOCODE_IN_BACKGROUND` ativo e sem endereço equivalente, a coleção é criada sem coordenadas
+       e um job `geocode_collection` é enfileirado para preenchê-las.
     2. Se as coordenadas não puderem ser recuperadas, uma exceção HTTP 400 é lançada.
-    3. Se as coordenadas forem obtidas com sucesso, a coleção é criada no banco de dados.
-    4. A coleção é associada ao usuário autenticado, e as coordenadas são salvas junto com os outros dados.
-    5. O novo registro da coleção é retornado.
+    3. O campo `time` é interpretado como uma janela de horário e uma vaga é reservada na janela
+       correspondente da região (ver `GET /collections/slots`); um período com várias janelas
+       ("manhã") ocupa a menos ocupada delas. Se não houver vaga, HTTP 409. Se o horário não
+       puder ser interpretado, a coleta é criada sem reservar vaga. Com `GEOCODE_IN_BACKGROUND`
+       e endereço ainda desconhecido, a vaga é reservada pelo worker; se a janela tiver lotado,
+       a coleta fica sem vaga e com `slot_rejected` verdadeiro.
+    4. Se as coordenadas forem obtidas com sucesso, a coleção é criada no banco de dados.
+    5. A coleção é associada ao usuário autenticado, e as coordenadas são salvas junto com os outros dados.
+    6. O novo registro da coleção é retornado.
 
     Retorna:
         - O objeto da coleção recém-criada, com todos os campos preenchidos, incluindo `id`, `user_id`, `latitude`, `longitude`, etc.
 
     Exceções:
         - HTTP 400: Caso não seja possível obter as coordenadas para o endereço fornecido.
+        - HTTP 409: Caso a janela de horário esteja lotada na região.
 
     Exemplos de Uso:
     ```
@@ -68,23 +93,64 @@ def create_collection(
     }
     ```
     """
-    lat_long = get_lat_long_from_address(collection_in.address)
-    if lat_long is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Não foi possível obter coordenadas para o endereço fornecido."
+    with idempotency_store.begin(db, f"collections:user:{current_user.id}", idempotency_key,
+                                 collection_in.model_dump(mode="json")) as request:
+        if request.replay is not None:
+            return request.replay
+
+        try:
+            window_start, window_end = parse_time_window(collection_in.time)
+        except ValueError:
+            # Horários livres que não correspondem a uma janela ("Qualquer horário") são aceitos
+            # como antes, mas a coleta não ocupa vaga
+            window_start, window_end = None, None
+
+        lat_long = geocode(collection_in.address, use_geocoder=not settings.GEOCODE_IN_BACKGROUND)
+        if lat_long is None:
+            if not settings.GEOCODE_IN_BACKGROUND:
+                raise HTTPException(
+                    status_code=400,
+                    detail="Não foi possível obter coordenadas para o endereço fornecido."
+                )
+            lat_long = (None, None)
+
+        collection = Collection(
+            user_id=current_user.id,
+            latitude=lat_long[0],
+            longitude=lat_long[1],
+            window_start=window_start,
+            window_end=window_end,
+            **collection_in.model_dump(exclude={"latitude", "longitude"})
         )
+        if not crud_slot.book_collection(db, collection):
+            db.rollback()
+            raise HTTPException(
+                status_code=status.HTTP_409_CONFLICT,
+                detail="Não há vagas disponíveis neste horário para a região informada."
+            )
+        db.add(collection)
+        if collection.latitude is None:
+            db.flush()
+            enqueue(db, "geocode_collection", {"collection_id": collection.id})
+        db.flush()
+        db.refresh(collection)
+        # A resposta é gravada na mesma transação que a coleta: ou ambas existem, ou nenhuma
+        request.save(200, CollectionSchema.model_validate(collection).model_dump(mode="json"))
+        db.commit()
+        collection_snapshot.add(collection)
+        return collection
 
-    collection = Collection(
-        user_id=current_user.id,
-        latitude=lat_long[0],
-        longitude=lat_long[1],
-        **collection_in.model_dump(exclude={"latitude", "longitude"})
-    )
-    db.add(collection)
-    db.commit()
-    db.refresh(collection)
-    return collection
+
+def _filter_collections(query, status_filter: Optional[CollectionStatus],
+                        date_from: Optional[date], date_to: Optional[date]):
+    # Filtros em `date` como intervalo semiaberto permitem ao PostgreSQL descartar partições
+    if status_filter is not None:
+        query = query.filter(Collection.status == status_filter)
+    if date_from is not None:
+        query = query.filter(Collection.date >= datetime.combine(date_from, datetime.min.time()))
+    if date_to is not None:
+        query = query.filter(Collection.date < datetime.combine(date_to + timedelta(days=1), datetime.min.time()))
+    return query
 
 
 @router.get("/user", response_model=List[CollectionSchema])
@@ -92,7 +158,10 @@ def list_user_collections(
         db: Session = Depends(get_db),
         current_user: User = Depends(get_current_user),
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        status_filter: Optional[CollectionStatus] = Query(None, alias="status"),
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
 ):
     """
     Recupera a lista de coleções associadas ao usuário autenticado.
@@ -102,13 +171,18 @@ def list_user_collections(
 
     - `skip`: Número de coleções a ignorar no início (default: 0).
     - `limit`: Número máximo de coleções a retornar (default: 100).
+    - `status`: Filtra pelo status da coleta (opcional).
+    - `date_from` / `date_to`: Filtra pelo período da coleta, inclusive (opcional). Como a tabela
+      é particionada por mês em `date`, apenas as partições do período são consultadas.
 
     Retorna:
         - Uma lista de coleções pertencentes ao usuário atual.
     """
-    collections = db.query(Collection).filter(
-        Collection.user_id == current_user.id
-    ).offset(skip).limit(limit).all()
+    query = _filter_collections(
+        db.query(Collection).filter(Collection.user_id == current_user.id),
+        status_filter, date_from, date_to
+    )
+    collections = query.offset(skip).limit(limit).all()
     return collections
 
 
@@ -116,7 +190,10 @@ def list_user_collections(
 def list_all_collections(
         db: Session = Depends(get_db),
         skip: int = 0,
-        limit: int = 100
+        limit: int = 100,
+        status_filter: Optional[CollectionStatus] = Query(None, alias="status"),
+        date_from: Optional[date] = None,
+        date_to: Optional[date] = None
 ):
     """
     Recupera a lista de todas as coleções cadastradas no sistema.
@@ -127,14 +204,124 @@ def list_all_collections(
 
     - `skip`: Número de coleções a ignorar no início (default: 0).
     - `limit`: Número máximo de coleções a retornar (default: 100).
+    - `status`: Filtra pelo status da coleta (opcional).
+    - `date_from` / `date_to`: Filtra pelo período da coleta, inclusive (opcional). Consultas
+      como "coletas pendentes deste mês" acessam apenas as partições do período.
 
     Retorna:
         - Uma lista de todas as coleções registradas no sistema.
     """
-    collections = db.query(Collection).offset(skip).limit(limit).all()
+    query = _filter_collections(db.query(Collection), status_filter, date_from, date_to)
+    collections = query.offset(skip).limit(limit).all()
     return collections
 
 
+@router.get("/heatmap", response_model=Heatmap)
+def collections_heatmap(
+        bbox: str = Query(..., description="min_lon,min_lat,max_lon,max_lat"),
+        zoom: int = Query(10, ge=0, le=20),
+        material: Optional[str] = None
+):
+    """
+    Retorna a densidade de coletas agregada em células de uma grade, para exibição em mapa de calor.
+
+    Em vez de enviar cada coleta ao cliente, as coordenadas são agrupadas no servidor em células
+    cujo tamanho depende do `zoom`; cada célula traz o número de coletas e o peso (kg) por material.
+    A agregação é feita sobre um snapshot em memória das coordenadas, atualizado incrementalmente em
+    segundo plano (coletas de outros processos aparecem em até `HEATMAP_REFRESH_SECONDS`), de modo
+    que o tamanho da resposta depende do número de células, e não do número de coletas.
+
+    Parâmetros:
+    - `bbox`: Área visível do mapa, no formato `min_lon,min_lat,max_lon,max_lat`.
+    - `zoom`: Nível de zoom do mapa (0 a 20). Se a área tiver células demais para o zoom, o tamanho
+      da célula é ampliado automaticamente.
+    - `material`: Filtra as coletas que contêm o material informado (opcional).
+
+    Exceções:
+        - HTTP 400: `bbox` em formato inválido, com valores não finitos ou vazio (após limitado a ±180/±90).
+
+    Exemplos de Uso:
+    ```
+    GET /collections/heatmap?bbox=-46.8,-23.7,-46.4,-23.4&zoom=12&material=papel
+    ```
+    ```
+    Resposta:
+    {
+        "cell_size": 0.010986328125,
+        "cells": [
+            {"lat": -23.5437, "lon": -46.6315, "count": 12, "kg": {"papel": 340.0}}
+        ]
+    }
+    ```
+    """
+    try:
+        min_lon, min_lat, max_lon, max_lat = (float(v) for v in bbox.split(","))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid bbox")
+    if not all(math.isfinite(v) for v in (min_lon, min_lat, max_lon, max_lat)):
+        raise HTTPException(status_code=400, detail="Invalid bbox")
+    # Limita o bbox ao globo: áreas maiores não contêm mais coletas, só multiplicariam células
+    min_lon, max_lon = max(min_lon, -180.0), min(max_lon, 180.0)
+    min_lat, max_lat = max(min_lat, -90.0), min(max_lat, 90.0)
+    if min_lon >= max_lon or min_lat >= max_lat:
+        raise HTTPException(status_code=400, detail="Invalid bbox")
+    box = (min_lon, min_lat, max_lon, max_lat)
+
+    points, items, materials = collection_snapshot.arrays()
+    cell_size = cell_size_for(zoom, box, settings.HEATMAP_MAX_CELLS)
+    return {"cell_size": cell_size, "cells": aggregate(points, items, materials, box, cell_size, material)}
+
+
+@router.get("/slots", response_model=SlotAvailability)
+def collection_slots(
+        db: Session = Depends(get_db),
+        lat: float = Query(..., ge=-90, le=90),
+        lon: float = Query(..., ge=-180, le=180),
+        day: date = Query(..., alias="date")
+):
+    """
+    Retorna a disponibilidade das janelas de coleta de um dia na região da coordenada informada.
+
+    A resposta é montada a partir dos contadores por zona e janela (`collection_slots`), mantidos
+    atomicamente na criação e na mudança de status das coletas, sem contar linhas de `collections`.
+    São listadas as janelas entre `SLOT_DAY_START` e `SLOT_DAY_END` e as demais janelas do dia que
+    já tenham coletas agendadas. Coletas agendadas para um período que abrange várias janelas
+    ("manhã", "08:00-12:00") ocupam uma única vaga, na janela menos ocupada do período.
+
+    Parâmetros:
+    - `lat`, `lon`: Coordenada do endereço da coleta.
+    - `date`: Dia desejado (AAAA-MM-DD).
+
+    Exemplos de Uso:
+    ```
+    GET /collections/slots?lat=-23.5505&lon=-46.6333&date=2024-11-26
+    ```
+    ```
+    Resposta:
+    {
+        "zone": "-1178:-2332",
+        "date": "2024-11-26",
+        "slots": [
+            {"start": "08:00:00", "end": "10:00:00", "capacity": 20, "booked": 3, "available": 17},
+            ...
+        ]
+    }
+    ```
+    """
+    zone = zone_for(lat, lon)
+    counters = crud_slot.get_day(db, zone=zone, day=day)
+    slots = []
+    # Inclui janelas fora do expediente (ex.: "noite") que já tenham coletas agendadas
+    for start in sorted(set(day_slots()) | set(counters)):
+        end = (datetime.combine(day, start) + timedelta(minutes=settings.SLOT_MINUTES)).time()
+        counter = counters.get(start)
+        capacity = counter.capacity if counter else settings.SLOT_CAPACITY
+        booked = counter.pending + counter.collected if counter else 0
+        slots.append({"start": start, "end": end, "capacity": capacity, "booked": booked,
+                      "available": max(capacity - booked, 0)})
+    return {"zone": zone, "date": day, "slots": slots}
+
+
 @router.patch("/{collection_id}", response_model=CollectionSchema)
 def update_collection(
         *,
@@ -189,10 +376,12 @@ def update_collection(
     }
     ```
     """
+    # A linha fica travada até o commit para que atualizações simultâneas de status não
+    # movimentem os contadores de vagas duas vezes
     collection = db.query(Collection).filter(
         Collection.id == collection_id,
         Collection.user_id == current_user.id
-    ).first()
+    ).with_for_update().first()
 
     if not collection:
         raise HTTPException(
@@ -201,7 +390,10 @@ def update_collection(
         )
 
     for field, value in collection_in.model_dump(exclude_unset=True).items():
-        setattr(collection, field, value)
+        if field == "status":
+            crud_slot.update_collection_status(db, collection, value)
+        else:
+            setattr(collection, field, value)
 
     db.commit()
     db.refresh(collection)
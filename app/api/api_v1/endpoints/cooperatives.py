@@ -1,17 +1,27 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
 from typing import List
+from pydantic import TypeAdapter
+from sqlalchemy import func
 from sqlalchemy.orm import Session
 
+from app.api.deps import rate_limit
+from app.core.compression import PrecompressedResponse, ResponseCache, etag_matches, variant_etag
+from app.core.config import settings
 from app.core.database import get_db
+from app.jobs.queue import enqueue
 from app.schemas.cooperative import CooperativeCreate, CooperativeOut as CooperativeSchema
 from app.models.cooperative import Cooperative
-from app.utils.geocoding import get_lat_long_from_address
+from app.models.tombstone import Tombstone
+from app.utils.addresses import geocode
 
 router = APIRouter()
 
+_cooperative_list = TypeAdapter(List[CooperativeSchema])
+_list_cache = ResponseCache()
+
 
 @router.get("/", response_model=List[CooperativeSchema])
-def list_cooperatives(db: Session = Depends(get_db), skip: int = 0,
+def list_cooperatives(request: Request, db: Session = Depends(get_db), skip: int = 0,
                       limit: int = 100):
     """
     Recupera a lista de todas as cooperativas cadastradas no sistema.
@@ -23,14 +33,41 @@ def list_cooperatives(db: Session = Depends(get_db), skip: int = 0,
     - `skip`: Número de registros a serem ignorados no início da lista (default: 0).
     - `limit`: Número máximo de registros a serem retornados (default: 100).
 
+    Cache:
+    - Cada página é serializada uma única vez por versão dos dados e guardada junto com as
+      variantes gzip/brotli, que também são comprimidas uma única vez. A versão é a quantidade de
+      linhas e a soma de `change_seq` das cooperativas e de suas exclusões: toda escrita confirmada
+      a altera, mesmo que confirmada depois de outra com `change_seq` maior (o que um simples
+      `max(change_seq)` não detectaria). A resposta traz um `ETag` distinto por codificação; com
+      `If-None-Match` correspondente, retorna 304.
+
     Retorna:
         - Uma lista de todas as cooperativas registradas no sistema, paginada conforme os parâmetros fornecidos.
     """
-    cooperatives = db.query(Cooperative).offset(skip).limit(limit).all()
-    return cooperatives
-
-
-@router.post("/", response_model=CooperativeSchema)
+    tombstones = db.query(Tombstone).filter(Tombstone.entity == Cooperative.__tablename__)
+    version = tuple(db.query(
+        func.count(Cooperative.id),
+        func.coalesce(func.sum(Cooperative.change_seq), 0),
+        tombstones.with_entities(func.count(Tombstone.id)).scalar_subquery(),
+        tombstones.with_entities(func.coalesce(func.sum(Tombstone.change_seq), 0)).scalar_subquery()
+    ).one())
+    tag = "-".join(str(part) for part in (*version, skip, limit))
+    accept_encoding = request.headers.get("accept-encoding", "")
+    etag = variant_etag(tag, accept_encoding)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Vary": "Accept-Encoding"})
+
+    cached = _list_cache.get((skip, limit), version)
+    if cached is None:
+        cooperatives = db.query(Cooperative).order_by(Cooperative.id).offset(skip).limit(limit).all()
+        cached = _list_cache.put((skip, limit), version, _cooperative_list.dump_json(
+            _cooperative_list.validate_python(cooperatives, from_attributes=True)
+        ))
+    return PrecompressedResponse(cached, accept_encoding, etag=tag)
+
+
+@router.post("/", response_model=CooperativeSchema,
+             dependencies=[Depends(rate_limit("create_cooperative", capacity=10, period=60))])
 def create_cooperative(*, db: Session = Depends(get_db), cooperative_in: CooperativeCreate):
     """
     Cria uma nova cooperativa e salva no banco de dados.
@@ -45,6 +82,10 @@ def create_cooperative(*, db: Session = Depends(get_db), cooperative_in: Coopera
     Regras:
     - O endereço deve ser válido para permitir a obtenção de coordenadas.
     - O sistema armazena automaticamente a latitude e longitude no registro da cooperativa.
+    - Endereços equivalentes a um já geocodificado (mesmo com grafia diferente) reaproveitam as
+      coordenadas conhecidas, sem consultar o geocodificador externo.
+    - Com `GEOCODE_IN_BACKGROUND` ativo, a cooperativa é criada sem coordenadas e um job
+      `geocode_cooperative` é enfileirado para preenchê-las.
 
     Retorna:
         - Os detalhes da cooperativa recém-criada, incluindo as coordenadas calculadas.
@@ -52,13 +93,14 @@ def create_cooperative(*, db: Session = Depends(get_db), cooperative_in: Coopera
     Exceções:
         - Retorna um erro HTTP 400 se não for possível geocodificar o endereço.
     """
-    lat_long = get_lat_long_from_address(cooperative_in.address)
-
+    lat_long = geocode(cooperative_in.address, use_geocoder=not settings.GEOCODE_IN_BACKGROUND)
     if lat_long is None:
-        raise HTTPException(
-            status_code=400,
-            detail="Não foi possível obter coordenadas para o endereço fornecido."
-        )
+        if not settings.GEOCODE_IN_BACKGROUND:
+            raise HTTPException(
+                status_code=400,
+                detail="Não foi possível obter coordenadas para o endereço fornecido."
+            )
+        lat_long = (None, None)
 
     cooperative = Cooperative(
         latitude=lat_long[0],
@@ -66,6 +108,9 @@ def create_cooperative(*, db: Session = Depends(get_db), cooperative_in: Coopera
         **cooperative_in.model_dump(exclude={"latitude", "longitude"}))
 
     db.add(cooperative)
+    if cooperative.latitude is None:
+        db.flush()
+        enqueue(db, "geocode_cooperative", {"cooperative_id": cooperative.id})
     db.commit()
     db.refresh(cooperative)
     return cooperative
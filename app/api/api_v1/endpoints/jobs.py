@@ -0,0 +1,27 @@
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.core.database import get_db
+from app.jobs.queue import queue_metrics
+from app.models.user import User
+from app.schemas.job import QueueMetrics
+
+router = APIRouter()
+
+
+@router.get("/metrics", response_model=QueueMetrics)
+def jobs_metrics(
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user),
+        window_minutes: int = Query(60, ge=1, le=24 * 60)
+):
+    """
+    Retorna métricas da fila de jobs em segundo plano.
+
+    - `depth`: Quantidade de jobs aguardando (`queued`) e em execução (`running`) por tipo.
+    - `latency`: Para os jobs concluídos nos últimos `window_minutes`, a média e o p95 do tempo de
+      espera na fila e do tempo de execução, por tipo.
+    - `oldest_ready_age_seconds`: Há quanto tempo o job pronto mais antigo aguarda um worker.
+    """
+    return queue_metrics(db, window_minutes=window_minutes)
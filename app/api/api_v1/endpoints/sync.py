@@ -0,0 +1,136 @@
+import time
+from typing import NamedTuple, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import and_, or_, tuple_
+from sqlalchemy.orm import Session
+
+from app.api.deps import get_current_user
+from app.core.config import settings
+from app.core.database import committed_xid_horizon, get_db
+from app.models.collection import Collection
+from app.models.cooperative import Cooperative
+from app.models.tombstone import Tombstone
+from app.models.user import User
+from app.schemas.sync import SyncResponse
+
+router = APIRouter()
+
+
+class SyncToken(NamedTuple):
+    xid: int  # Posição `(change_xid, change_seq)` da última alteração já entregue ao cliente
+    seq: int
+    issued: int  # Momento (epoch, em segundos) a partir do qual as exclusões ainda não foram entregues
+    reset: bool  # O token não vale mais: o cliente recebe o estado completo e descarta a cópia local
+
+
+def _parse_token(since: Optional[str], now: Optional[float] = None) -> SyncToken:
+    """
+    Interpreta o token `change_xid:change_seq:emissão` da sincronização anterior.
+
+    Tokens antigos (sem `change_xid` ou sem emissão) e tokens emitidos há mais de
+    `TOMBSTONE_RETENTION_DAYS` — cujas exclusões pendentes podem já ter sido removidas — provocam
+    uma sincronização completa com `reset`.
+    """
+    now = int(time.time() if now is None else now)
+    if not since:
+        return SyncToken(0, 0, now, False)
+    parts = since.split(":")
+    try:
+        values = [int(part) for part in parts]
+    except ValueError:
+        values = [-1]
+    if len(values) > 3 or min(values) < 0:
+        raise HTTPException(status_code=400, detail="Invalid sync token")
+    if len(values) < 3 or values[2] < now - settings.TOMBSTONE_RETENTION_DAYS * 86400:
+        return SyncToken(0, 0, now, True)
+    return SyncToken(*values, False)
+
+
+@router.get("", response_model=SyncResponse)
+def sync(
+        db: Session = Depends(get_db),
+        current_user: User = Depends(get_current_user),
+        since: Optional[str] = None,
+        limit: int = Query(500, ge=1, le=1000)
+):
+    """
+    Retorna as alterações ocorridas desde o último token de sincronização do cliente.
+
+    Pensado para clientes móveis com conectividade limitada: em vez de baixar novamente todas as
+    páginas de coletas e cooperativas, o cliente envia o `next_token` da sincronização anterior e
+    recebe apenas os registros criados ou alterados (inclusive mudanças de status) e os registros
+    excluídos desde então. Cada alteração é marcada com a transação que a gravou (`change_xid`) e
+    com a sequência `change_seq`, indexadas em todas as tabelas, portanto o custo de cada
+    sincronização é proporcional ao número de alterações, e não ao tamanho da base.
+
+    Parâmetros:
+    - `since`: Token retornado pela sincronização anterior. Omitido na primeira sincronização,
+      que devolve o estado completo. Tokens com mais de `TOMBSTONE_RETENTION_DAYS` dias (as
+      exclusões são mantidas apenas por esse prazo) também recebem o estado completo, com
+      `reset` verdadeiro.
+    - `limit`: Número máximo de alterações por resposta (default: 500).
+
+    Fluxo:
+    1. São buscadas, em ordem de `(change_xid, change_seq)`, as coletas do usuário autenticado, as
+       cooperativas e as exclusões posteriores ao token. Alterações de transações ainda em andamento
+       (ou iniciadas depois de outra ainda em andamento) ficam para a próxima sincronização, de modo
+       que uma confirmação tardia nunca fica para trás do token.
+    2. As alterações das três fontes são intercaladas e limitadas a `limit`.
+    3. `next_token` aponta para a última alteração incluída; se `has_more` for verdadeiro, o cliente
+       deve sincronizar novamente com esse token.
+
+    O cliente deve aplicar os registros recebidos como upsert por `id` e remover os listados em
+    `deleted`; com `reset`, deve antes descartar a cópia local. A resposta é comprimida (brotli ou
+    gzip) conforme o `Accept-Encoding` do cliente.
+
+    Exceções:
+        - HTTP 400: Token de sincronização inválido.
+    """
+    token = _parse_token(since)
+    position = (token.xid, token.seq)
+    # Apenas alterações de transações já encerradas: uma transação em andamento pode confirmar
+    # depois linhas com `change_seq` menor que o de alterações já visíveis
+    horizon = committed_xid_horizon(db)
+
+    def changed(model, *criteria):
+        cursor = tuple_(model.change_xid, model.change_seq)
+        return db.query(model).filter(
+            model.change_xid < horizon,
+            cursor > tuple_(*position),
+            *criteria
+        ).order_by(model.change_xid, model.change_seq).limit(limit + 1).all()
+
+    collections = changed(Collection, Collection.user_id == current_user.id)
+    cooperatives = changed(Cooperative)
+    tombstones = changed(Tombstone, or_(
+        and_(Tombstone.entity == Collection.__tablename__, Tombstone.owner_id == current_user.id),
+        and_(Tombstone.entity == Cooperative.__tablename__, Tombstone.owner_id.is_(None)),
+    ))
+
+    changes = sorted(
+        [((c.change_xid, c.change_seq), "collection", c) for c in collections]
+        + [((c.change_xid, c.change_seq), "cooperative", c) for c in cooperatives]
+        + [((t.change_xid, t.change_seq), "deleted", t) for t in tombstones],
+        key=lambda change: change[0],
+    )
+    has_more = len(changes) > limit
+    changes = changes[:limit]
+
+    if has_more:
+        # A emissão só avança quando o cliente alcança o horizonte: até lá, exclusões anteriores
+        # ainda podem estar pendentes
+        next_position, issued = changes[-1][0], token.issued
+    else:
+        # Tudo abaixo do horizonte foi entregue; a próxima sincronização parte dele
+        next_position, issued = max(position, (horizon, 0)), int(time.time())
+    response = {"collections": [], "cooperatives": [], "deleted": [], "has_more": has_more,
+                "reset": token.reset,
+                "next_token": f"{next_position[0]}:{next_position[1]}:{issued}"}
+    for _, kind, obj in changes:
+        if kind == "collection":
+            response["collections"].append(obj)
+        elif kind == "cooperative":
+            response["cooperatives"].append(obj)
+        else:
+            response["deleted"].append({"entity": obj.entity, "id": obj.entity_id})
+    return response
@@ -1,6 +1,8 @@
-from fastapi import APIRouter, Depends, HTTPException
+from typing import Optional
+from fastapi import APIRouter, Depends, Header, HTTPException
 from sqlalchemy.orm import Session
 from app.core.database import get_db
+from app.core.idempotency import idempotency_store
 from app.crud import crud_user
 from app.schemas.user import UserCreate, User
 
@@ -8,7 +10,8 @@ router = APIRouter()
 
 
 @router.post("/", response_model=User, status_code=201)
-def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
+def create_user(user_in: UserCreate, db: Session = Depends(get_db),
+                idempotency_key: Optional[str] = Header(None, alias="Idempotency-Key")):
     """
     Cria um novo usuário no sistema.
 
@@ -19,6 +22,8 @@ def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
     Parâmetros:
     - `user_in`: Um objeto contendo os dados do novo usuário a ser criado (nome, email, senha, etc.).
     - `db`: Sessão do banco de dados injetada automaticamente.
+    - `Idempotency-Key` (header, opcional): Repetições com a mesma chave devolvem a resposta
+      original, sem recalcular o hash da senha.
 
     Fluxo:
     1. Verifica se já existe um usuário com o email fornecido.
@@ -64,11 +69,20 @@ def create_user(user_in: UserCreate, db: Session = Depends(get_db)):
     ```
     """
 
-    # Verifica se o email já está em uso
-    existing_user = db.query(crud_user.User).filter_by(email=user_in.email).first()
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Email already registered")
+    # A senha fica fora da identificação da requisição; o escopo é o email do cadastro
+    with idempotency_store.begin(db, f"users:{user_in.email.lower()}", idempotency_key,
+                                 user_in.model_dump(mode="json", exclude={"password"})) as request:
+        if request.replay is not None:
+            return request.replay
 
-    # Cria o usuário no banco de dados
-    user = crud_user.create(db=db, obj_in=user_in)
-    return user
+        # Verifica se o email já está em uso
+        existing_user = db.query(crud_user.User).filter_by(email=user_in.email).first()
+        if existing_user:
+            raise HTTPException(status_code=400, detail="Email already registered")
+
+        # Cria o usuário no banco de dados
+        user = crud_user.create(db=db, obj_in=user_in, commit=False)
+        # A resposta é gravada na mesma transação que o usuário
+        request.save(201, User.model_validate(user).model_dump(mode="json"))
+        db.commit()
+        return user
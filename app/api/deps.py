@@ -1,31 +1,86 @@
-from typing import Generator, Optional
-from fastapi import Depends, HTTPException, status
+from typing import Callable, Generator, Optional
+from fastapi import Depends, HTTPException, Request, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import jwt, JWTError
 from pydantic import ValidationError
 from sqlalchemy.orm import Session
 from app.core.config import settings
 from app.core.database import get_db
+from app.core.rate_limit import TokenBucket
+from app.core.revocation import revocation_list
+from app.core.security import ACCESS_TOKEN_TYPE, InvalidTokenError, decode_token
 from app.models.user import User
 from app.schemas.token import TokenPayload
 
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl=f"{settings.API_V1_STR}/auth/login")
 
-def get_current_user(
+def get_token_payload(
     db: Session = Depends(get_db),
     token: str = Depends(oauth2_scheme)
-) -> User:
+) -> TokenPayload:
     try:
-        payload = jwt.decode(
-            token, settings.SECRET_KEY, algorithms=settings.ALGORITHM
-        )
+        payload = decode_token(token)
         token_data = TokenPayload(**payload)
-    except (JWTError, ValidationError):
+    except (InvalidTokenError, ValidationError):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Could not validate credentials",
+        )
+    # Tokens emitidos antes da introdução do campo `type` são tratados como de acesso
+    if token_data.type not in (None, ACCESS_TOKEN_TYPE):
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Could not validate credentials",
         )
+    revocation_list.maybe_sync(db)
+    if token_data.jti and revocation_list.is_revoked(token_data.jti):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Token has been revoked",
+        )
+    return token_data
+
+def get_current_user(
+    db: Session = Depends(get_db),
+    token_data: TokenPayload = Depends(get_token_payload)
+) -> User:
     user = db.query(User).filter(User.id == token_data.sub).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
-    return user
\ No newline at end of file
+    return user
+
+
+def get_client_ip(request: Request) -> str:
+    if settings.RATE_LIMIT_TRUST_FORWARDED:
+        forwarded = request.headers.get("x-forwarded-for")
+        if forwarded:
+            return forwarded.split(",", 1)[0].strip()
+    return request.client.host if request.client else "unknown"
+
+def _check_rate_limit(bucket: TokenBucket, identity: str) -> None:
+    allowed, retry_after = bucket.hit(identity)
+    if not allowed:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many requests",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+def rate_limit(name: str, capacity: int, period: float, per_user: bool = False) -> Callable:
+    """
+    Cria uma dependência que limita a rota a `capacity` requisições a cada `period` segundos.
+
+    Com `per_user=True` o limite é por usuário autenticado (reaproveitando `get_current_user`,
+    que o FastAPI resolve uma única vez por requisição); caso contrário, é por IP do cliente.
+    """
+    bucket = TokenBucket(name, capacity, period)
+
+    if per_user:
+        def user_rate_limit(current_user: User = Depends(get_current_user)) -> None:
+            if settings.RATE_LIMIT_ENABLED:
+                _check_rate_limit(bucket, f"user:{current_user.id}")
+        return user_rate_limit
+
+    def ip_rate_limit(request: Request) -> None:
+        if settings.RATE_LIMIT_ENABLED:
+            _check_rate_limit(bucket, f"ip:{get_client_ip(request)}")
+    return ip_rate_limit
@@ -0,0 +1,122 @@
+"""
+Comandos de manutenção do banco de dados.
+
+Uso:
+    python -m app.cli ensure-partitions [--months-ahead N]
+    python -m app.cli archive-collections --before AAAA-MM [--format csv|parquet] [--output-dir DIR] [--dry-run]
+    python -m app.cli apply-retention [--dry-run]
+    python -m app.cli backfill-slots
+    python -m app.cli purge-expired
+
+`apply-retention` aplica a política configurada em `COLLECTIONS_RETENTION_MONTHS` e deve rodar
+periodicamente (por exemplo, via cron), junto com `ensure-partitions` e `purge-expired`.
+"""
+import argparse
+import sys
+from datetime import date, datetime
+from typing import List
+
+from app.core import partitioning
+from app.core.config import settings
+from app.core.database import SessionLocal, engine
+from app.core.idempotency import idempotency_store
+from app.core.revocation import revocation_list
+from app.crud import crud_slot, crud_tombstone
+from app.jobs.queue import purge_finished
+
+
+def ensure_partitions(args) -> None:
+    today = date.today()
+    with engine.begin() as conn:
+        created = partitioning.ensure_partitions(
+            conn, partitioning.month_start(today), partitioning.add_months(today, args.months_ahead)
+        )
+    print("Partições criadas: " + (", ".join(created) if created else "nenhuma"))
+
+
+def _archive(names: List[str], fmt: str, output_dir: str, dry_run: bool) -> None:
+    if not names:
+        print("Nenhuma partição a arquivar.")
+        return
+    for name in names:
+        if dry_run:
+            print(f"[dry-run] {name} seria arquivada em {output_dir}")
+            continue
+        # Uma transação por partição: uma falha não desfaz as partições já arquivadas
+        with engine.begin() as conn:
+            path = partitioning.archive_partition(conn, name, output_dir, fmt)
+        print(f"{name} arquivada em {path}")
+
+
+def archive_collections(args) -> None:
+    before = partitioning.month_start(datetime.strptime(args.before, "%Y-%m").date())
+    with engine.connect() as conn:
+        names = [name for name, month in partitioning.list_partitions(conn) if month < before]
+    _archive(names, args.format, args.output_dir, args.dry_run)
+
+
+def apply_retention(args) -> None:
+    with engine.connect() as conn:
+        names = partitioning.expired_partitions(conn, settings.COLLECTIONS_RETENTION_MONTHS)
+    _archive(names, settings.COLLECTIONS_ARCHIVE_FORMAT, settings.COLLECTIONS_ARCHIVE_DIR, args.dry_run)
+
+
+def backfill_slots(args) -> None:
+    db = SessionLocal()
+    try:
+        updated = crud_slot.backfill(db)
+        crud_slot.recount(db)
+        db.commit()
+    finally:
+        db.close()
+    print(f"Coletas contabilizadas: {updated}; contadores de vagas recalculados.")
+
+
+def purge_expired(args) -> None:
+    db = SessionLocal()
+    try:
+        revoked = revocation_list.purge_expired(db)
+        keys = idempotency_store.purge_expired(db)
+        jobs = purge_finished(db)
+        tombstones = crud_tombstone.purge_expired(db)
+    finally:
+        db.close()
+    print(f"Tokens revogados expirados removidos: {revoked}")
+    print(f"Chaves de idempotência expiradas removidas: {keys}")
+    print(f"Jobs finalizados removidos: {jobs}")
+    print(f"Exclusões anteriores à retenção removidas: {tombstones}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m app.cli")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    p = subparsers.add_parser("ensure-partitions", help="Cria as partições mensais dos próximos meses")
+    p.add_argument("--months-ahead", type=int, default=settings.COLLECTIONS_PARTITIONS_AHEAD)
+    p.set_defaults(func=ensure_partitions)
+
+    p = subparsers.add_parser("archive-collections", help="Arquiva e remove partições anteriores a um mês")
+    p.add_argument("--before", required=True, help="Mês (AAAA-MM); partições anteriores são arquivadas")
+    p.add_argument("--format", choices=["csv", "parquet"], default=settings.COLLECTIONS_ARCHIVE_FORMAT)
+    p.add_argument("--output-dir", default=settings.COLLECTIONS_ARCHIVE_DIR)
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=archive_collections)
+
+    p = subparsers.add_parser("apply-retention", help="Arquiva as partições fora da janela de retenção")
+    p.add_argument("--dry-run", action="store_true")
+    p.set_defaults(func=apply_retention)
+
+    p = subparsers.add_parser("backfill-slots",
+                              help="Contabiliza as coletas existentes e recalcula os contadores de vagas")
+    p.set_defaults(func=backfill_slots)
+
+    p = subparsers.add_parser("purge-expired", help="Remove registros expirados de tabelas auxiliares")
+    p.set_defaults(func=purge_expired)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
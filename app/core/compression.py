@@ -0,0 +1,208 @@
+import gzip
+import threading
+from typing import Dict, Optional, Tuple
+
+import anyio
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.responses import Response
+
+from app.core.config import settings
+
+# Tipos de conteúdo que se beneficiam de compressão (texto e JSON)
+_COMPRESSIBLE_PREFIXES = ("application/json", "text/", "application/javascript", "image/svg+xml")
+
+
+def _brotli():
+    # `brotli` é opcional: sem ele, apenas gzip é oferecido
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def choose_encoding(accept_encoding: str) -> Optional[str]:
+    """Escolhe `br` ou `gzip` conforme o header `Accept-Encoding` (respeitando q-values)."""
+    weights: Dict[str, float] = {}
+    for part in accept_encoding.split(","):
+        name, _, params = part.strip().partition(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[name] = q
+
+    wildcard = weights.get("*", 0.0)
+    candidates = ["br", "gzip"] if _brotli() is not None else ["gzip"]
+    best, best_q = None, 0.0
+    for encoding in candidates:
+        q = weights.get(encoding, wildcard)
+        if q > best_q:
+            best, best_q = encoding, q
+    return best
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return _brotli().compress(body, quality=settings.COMPRESSION_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=settings.COMPRESSION_GZIP_LEVEL, mtime=0)
+
+
+def is_compressible(content_type: Optional[str]) -> bool:
+    return bool(content_type) and content_type.startswith(_COMPRESSIBLE_PREFIXES)
+
+
+class CompressionMiddleware:
+    """
+    Comprime respostas com brotli ou gzip conforme o `Accept-Encoding` do cliente.
+
+    Apenas respostas de tipos textuais com pelo menos `minimum_size` bytes são comprimidas. A
+    compressão roda numa thread do pool do AnyIO, nunca no event loop. Respostas que já trazem
+    `Content-Encoding` (como as pré-comprimidas de `PrecompressedResponse`) e respostas em
+    streaming são repassadas sem alteração.
+    """
+
+    def __init__(self, app, minimum_size: int = 500):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = choose_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if message["type"] == "http.response.start":
+                start_message = message
+                return
+            if message["type"] != "http.response.body" or passthrough:
+                await send(message)
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or not is_compressible(headers.get("content-type"))
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = await anyio.to_thread.run_sync(compress, body, encoding)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
+
+
+class CompressedBody:
+    """Corpo de resposta com as variantes comprimidas calculadas uma única vez, sob demanda."""
+
+    def __init__(self, raw: bytes):
+        self.raw = raw
+        self._variants: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def get(self, encoding: Optional[str]) -> bytes:
+        if encoding is None:
+            return self.raw
+        variant = self._variants.get(encoding)
+        if variant is None:
+            with self._lock:
+                variant = self._variants.get(encoding)
+                if variant is None:
+                    variant = self._variants[encoding] = compress(self.raw, encoding)
+        return variant
+
+
+def variant_etag(tag: str, accept_encoding: str) -> str:
+    """
+    ETag forte da variante servida para `accept_encoding`: `tag` (sem aspas) seguido da codificação.
+
+    Cada codificação é uma representação diferente e precisa de um ETag próprio; caso contrário
+    um cache intermediário poderia validar o corpo gzip com o ETag do corpo sem compressão.
+    """
+    encoding = choose_encoding(accept_encoding)
+    return f'"{tag}-{encoding}"' if encoding is not None else f'"{tag}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Se o header `If-None-Match` contém `etag` (comparação fraca, como exige a RFC 9110)."""
+    if not if_none_match:
+        return False
+    candidates = [candidate.strip() for candidate in if_none_match.split(",")]
+    return "*" in candidates or etag in (candidate.removeprefix("W/") for candidate in candidates)
+
+
+class PrecompressedResponse(Response):
+    """
+    Resposta a partir de um `CompressedBody` em cache, na codificação aceita pelo cliente.
+
+    Deve ser criada em endpoints síncronos (executados no threadpool), já que a primeira
+    requisição de cada codificação paga a compressão. Com `etag` (sem aspas), o header `ETag`
+    é o de `variant_etag`, distinto para cada codificação.
+    """
+
+    media_type = "application/json"
+
+    def __init__(self, cached: CompressedBody, accept_encoding: str, etag: Optional[str] = None):
+        encoding = None
+        if len(cached.raw) >= settings.COMPRESSION_MIN_SIZE:
+            encoding = choose_encoding(accept_encoding)
+        headers = {"Vary": "Accept-Encoding"}
+        if encoding is not None:
+            headers["Content-Encoding"] = encoding
+        if etag is not None:
+            headers["ETag"] = variant_etag(etag, accept_encoding)
+        super().__init__(content=cached.get(encoding), headers=headers)
+
+
+class ResponseCache:
+    """
+    Cache em memória de corpos de resposta serializados, validado por uma versão.
+
+    O chamador informa a versão atual dos dados (por exemplo, a quantidade de linhas e a soma
+    de `change_seq`, que mudam a cada escrita confirmada); uma entrada só é reutilizada se foi
+    gerada para a mesma versão, o que mantém o cache correto mesmo com escritas feitas por
+    outros processos.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        self.max_entries = max_entries
+        self._entries: Dict[object, Tuple[object, CompressedBody]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key, version) -> Optional[CompressedBody]:
+        entry = self._entries.get(key)
+        if entry is not None and entry[0] == version:
+            return entry[1]
+        return None
+
+    def put(self, key, version, raw: bytes) -> CompressedBody:
+        body = CompressedBody(raw)
+        with self._lock:
+            if len(self._entries) >= self.max_entries and key not in self._entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[key] = (version, body)
+        return body
@@ -1,38 +1,153 @@
-import os
-from typing import List
+from typing import List, Optional
 
-from dotenv import load_dotenv
-from pydantic_settings import BaseSettings
-from pydantic import AnyHttpUrl
-
-load_dotenv()
+from pydantic import field_validator, model_validator
+from pydantic_settings import BaseSettings, SettingsConfigDict
 
 
 class Settings(BaseSettings):
-    PROJECT_NAME: str = os.getenv("PROJECT_NAME")
+    """
+    Configuração da aplicação, lida das variáveis de ambiente e do arquivo `.env`.
+
+    A validação acontece ao importar este módulo: variáveis obrigatórias ausentes ou inválidas
+    interrompem a inicialização com um erro explícito, em vez de falhar na primeira requisição.
+    """
+
+    model_config = SettingsConfigDict(case_sensitive=True, env_file=".env", extra="ignore")
+
+    PROJECT_NAME: str = "Ecolink"
     API_V1_STR: str = "/api/v1"
-    SECRET_KEY: str = os.getenv("SECRET_KEY")  # Change in production
-    ALGORITHM: str = os.getenv("ALGORITHM")
-    ACCESS_TOKEN_EXPIRE_MINUTES: int = 60 * 24  # 1 day
+    SECRET_KEY: str
+    ALGORITHM: str = "HS256"
+    ACCESS_TOKEN_EXPIRE_MINUTES: int = 15
+    REFRESH_TOKEN_EXPIRE_MINUTES: int = 60 * 24 * 7  # 7 days
+    # Intervalo entre sincronizações da lista de tokens revogados
+    TOKEN_REVOCATION_SYNC_SECONDS: int = 30
+
+    # Database: DATABASE_URL tem precedência; caso ausente, é montada a partir das variáveis POSTGRES_*
+    POSTGRES_SERVER: Optional[str] = None
+    POSTGRES_USER: Optional[str] = None
+    POSTGRES_PASSWORD: Optional[str] = None
+    POSTGRES_DB: Optional[str] = None
+    DATABASE_URL: Optional[str] = None
+
+    # Rate limiting (memória do processo, ou Redis se RATE_LIMIT_REDIS_URL for definido)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_REDIS_URL: Optional[str] = None
+    # Tempo máximo de conexão/resposta do Redis e intervalo até tentar de novo após uma falha
+    RATE_LIMIT_REDIS_TIMEOUT_SECONDS: float = 0.25
+    RATE_LIMIT_REDIS_RETRY_SECONDS: float = 30
+    # Usa o primeiro IP de X-Forwarded-For (apenas atrás de um proxy confiável)
+    RATE_LIMIT_TRUST_FORWARDED: bool = False
+
+    # Idempotency-Key: tempo de retenção das respostas, espera máxima por requisições duplicadas e
+    # prazo após o qual uma chave "em andamento" é considerada abandonada e pode ser retomada
+    IDEMPOTENCY_TTL_SECONDS: int = 60 * 60 * 24
+    IDEMPOTENCY_WAIT_SECONDS: float = 15
+    IDEMPOTENCY_LOCK_SECONDS: float = 60
+
+    # Exclusões (`tombstones`) são mantidas por este prazo; tokens de sincronização mais antigos
+    # provocam uma sincronização completa
+    TOMBSTONE_RETENTION_DAYS: int = 90
+
+    # Mapa de calor: intervalo para buscar coletas novas e para reconstruir o snapshot completo
+    HEATMAP_REFRESH_SECONDS: int = 60
+    HEATMAP_REBUILD_SECONDS: int = 60 * 60
+    HEATMAP_MAX_CELLS: int = 10_000
+
+    # Fila de jobs em segundo plano (worker: `python -m app.jobs`)
+    JOB_POLL_SECONDS: float = 1.0
+    JOB_TIMEOUT_SECONDS: int = 300  # Jobs "running" há mais tempo são considerados abandonados
+    JOB_BACKOFF_SECONDS: float = 10
+    JOB_MAX_BACKOFF_SECONDS: float = 60 * 60
+    JOB_RETENTION_SECONDS: int = 60 * 60 * 24 * 7  # Jobs concluídos/falhos são removidos após este prazo
+    # Se verdadeiro, coletas e cooperativas são criadas sem coordenadas e geocodificadas pelo worker
+    GEOCODE_IN_BACKGROUND: bool = False
+    # Limite de chamadas ao geocodificador externo (a política do Nominatim permite 1 por segundo),
+    # compartilhado entre processos quando RATE_LIMIT_REDIS_URL é definido, e espera máxima por vez
+    GEOCODER_RATE_PER_SECOND: float = 1.0
+    GEOCODER_MAX_WAIT_SECONDS: float = 10
 
-    # Database
-    POSTGRES_SERVER: str = os.getenv("POSTGRES_SERVER")
-    POSTGRES_USER: str = os.getenv("POSTGRES_USER")
-    POSTGRES_PASSWORD: str = os.getenv("POSTGRES_PASSWORD")
-    POSTGRES_DB: str = os.getenv("POSTGRES_DB")
-    DATABASE_URL: str = f"postgresql://{POSTGRES_USER}:{POSTGRES_PASSWORD}@{POSTGRES_SERVER}/{POSTGRES_DB}"
+    # Índice de endereços já geocodificados: endereços com similaridade de trigramas acima de
+    # ADDRESS_MATCH_THRESHOLD reaproveitam as coordenadas conhecidas sem chamar o geocodificador.
+    # Endereços equivalentes a mais de ADDRESS_CONFLICT_METERS de distância são contados como conflito
+    ADDRESS_MATCH_ENABLED: bool = True
+    ADDRESS_MATCH_THRESHOLD: float = 0.6
+    ADDRESS_CONFLICT_METERS: float = 250
+    ADDRESS_INDEX_REFRESH_SECONDS: int = 60
+    ADDRESS_INDEX_REBUILD_SECONDS: int = 60 * 60
+
+    # Agendamento: janelas de SLOT_MINUTES entre SLOT_DAY_START e SLOT_DAY_END (horas), com
+    # SLOT_CAPACITY coletas por janela em cada zona (célula de ZONE_CELL_DEGREES graus)
+    SLOT_MINUTES: int = 120
+    SLOT_DAY_START: int = 8
+    SLOT_DAY_END: int = 18
+    SLOT_CAPACITY: int = 20
+    ZONE_CELL_DEGREES: float = 0.02
+
+    # Compressão de respostas (brotli requer o pacote `Brotli`; sem ele, apenas gzip)
+    COMPRESSION_MIN_SIZE: int = 500
+    COMPRESSION_GZIP_LEVEL: int = 6
+    COMPRESSION_BROTLI_QUALITY: int = 5
+
+    # Retenção da tabela `collections` (particionada por mês): partições com mais de
+    # COLLECTIONS_RETENTION_MONTHS meses são arquivadas em COLLECTIONS_ARCHIVE_DIR e removidas
+    COLLECTIONS_RETENTION_MONTHS: int = 24
+    COLLECTIONS_PARTITIONS_AHEAD: int = 3
+    COLLECTIONS_ARCHIVE_DIR: str = "archive"
+    COLLECTIONS_ARCHIVE_FORMAT: str = "csv"  # "csv" (gzip) ou "parquet" (requer pyarrow)
 
     # CORS
-    BACKEND_CORS_ORIGINS: str = os.getenv("BACKEND_CORS_ORIGINS", "*")
+    BACKEND_CORS_ORIGINS: str = "*"
+
+    @field_validator("SECRET_KEY")
+    @classmethod
+    def check_secret_key(cls, v: str) -> str:
+        if len(v) < 16:
+            raise ValueError("SECRET_KEY must be at least 16 characters long")
+        return v
+
+    @field_validator("ALGORITHM")
+    @classmethod
+    def check_algorithm(cls, v: str) -> str:
+        # Os tokens são assinados com SECRET_KEY, portanto apenas algoritmos HMAC se aplicam
+        if v not in ("HS256", "HS384", "HS512"):
+            raise ValueError("ALGORITHM must be one of HS256, HS384, HS512")
+        return v
+
+    @field_validator("COLLECTIONS_ARCHIVE_FORMAT")
+    @classmethod
+    def check_archive_format(cls, v: str) -> str:
+        if v not in ("csv", "parquet"):
+            raise ValueError("COLLECTIONS_ARCHIVE_FORMAT must be 'csv' or 'parquet'")
+        return v
+
+    @field_validator("ADDRESS_MATCH_THRESHOLD")
+    @classmethod
+    def check_match_threshold(cls, v: float) -> float:
+        if not 0 < v <= 1:
+            raise ValueError("ADDRESS_MATCH_THRESHOLD must be in (0, 1]")
+        return v
+
+    @model_validator(mode="after")
+    def assemble_database_url(self) -> "Settings":
+        if self.DATABASE_URL:
+            return self
+        missing = [
+            name for name in ("POSTGRES_SERVER", "POSTGRES_USER", "POSTGRES_PASSWORD", "POSTGRES_DB")
+            if not getattr(self, name)
+        ]
+        if missing:
+            raise ValueError(f"DATABASE_URL or {', '.join(missing)} must be set")
+        self.DATABASE_URL = (
+            f"postgresql://{self.POSTGRES_USER}:{self.POSTGRES_PASSWORD}"
+            f"@{self.POSTGRES_SERVER}/{self.POSTGRES_DB}"
+        )
+        return self
 
     def get_cors_origins(self) -> List[str]:
         if self.BACKEND_CORS_ORIGINS == "*":
             return ["*"]  # Permite todas as origens
         return [origin.strip() for origin in self.BACKEND_CORS_ORIGINS.split(",")]
 
-    class Config:
-        case_sensitive = True
-        env_file = ".env"
-
 
 settings = Settings()
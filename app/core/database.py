@@ -1,13 +1,65 @@
-from sqlalchemy import create_engine
+import logging
+import threading
+import time
+from typing import Callable
+
+from sqlalchemy import Sequence, create_engine, text
 from sqlalchemy.ext.declarative import DeclarativeMeta, declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
 from app.core.config import settings
 
+logger = logging.getLogger(__name__)
+
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base: DeclarativeMeta = declarative_base()
 
+# Sequência global de alterações, compartilhada pelas tabelas sincronizáveis (ver `GET /sync`).
+# Cada inserção, atualização ou exclusão recebe um valor maior que o de qualquer alteração
+# anterior, de modo que um cliente busca apenas o que mudou desde o último valor recebido.
+change_sequence = Sequence("change_seq", metadata=Base.metadata)
+
+# Transação que gravou a linha (`xid8` do PostgreSQL 13+, como bigint). O `change_seq` é obtido
+# na escrita, não no commit: uma transação pode confirmar uma linha com valor menor que o de outra
+# já visível. Leitores incrementais usam `change_xid` com `committed_xid_horizon` para nunca
+# avançar além de alterações ainda não confirmadas.
+current_xact_id = text("pg_current_xact_id()::text::bigint")
+
+
+def committed_xid_horizon(db) -> int:
+    """
+    Menor id de transação ainda em andamento (`xmin` do snapshot atual).
+
+    Toda transação com id menor já terminou: as linhas com `change_xid` abaixo desse valor já
+    estão visíveis e nenhuma outra com id menor ainda pode aparecer.
+    """
+    return db.execute(text("SELECT pg_snapshot_xmin(pg_current_snapshot())::text::bigint")).scalar()
+
+
+def refresh_periodically(name: str, refresh: Callable[[Session], None], interval: float) -> threading.Thread:
+    """
+    Executa `refresh(db)` a cada `interval` segundos numa thread daemon, com uma sessão por execução.
+
+    Usado pelos caches em memória (índice de endereços, snapshot do mapa de calor) para que sua
+    carga nunca ocorra no caminho das requisições. Falhas são registradas e não encerram a thread.
+    """
+    def run() -> None:
+        while True:
+            db = SessionLocal()
+            try:
+                refresh(db)
+            except Exception:
+                logger.exception("Falha ao atualizar %s", name)
+            finally:
+                db.close()
+            time.sleep(interval)
+
+    thread = threading.Thread(target=run, name=name, daemon=True)
+    thread.start()
+    return thread
+
+
 def get_db():
     db = SessionLocal()
     try:
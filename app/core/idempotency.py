@@ -0,0 +1,250 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from fastapi import HTTPException, status
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.idempotency_key import IdempotencyKey
+
+# Intervalo de consulta ao banco enquanto outra instância processa a mesma chave
+_POLL_INTERVAL = 0.1
+
+
+class IdempotentRequest:
+    """
+    Resultado de `IdempotencyStore.begin`.
+
+    Se `replay` estiver definido, a resposta original deve ser devolvida sem reprocessar a
+    requisição. Caso contrário, o handler executa normalmente e chama `save` com a resposta
+    antes do `commit`: a resposta é gravada na mesma transação que a entidade criada.
+    """
+
+    def __init__(self, store: "IdempotencyStore", db: Session, key: Optional[str] = None,
+                 request_hash: Optional[str] = None, replay: Optional[JSONResponse] = None):
+        self._store = store
+        self._db = db
+        self.key = key
+        self.request_hash = request_hash
+        self.replay = replay
+        self.saved: Optional[Tuple[int, Any]] = None
+
+    def save(self, status_code: int, body: Any) -> None:
+        """Registra a resposta na transação atual, sem commit."""
+        if self.key is not None:
+            self._store._complete(self._db, self.key, status_code, body)
+        self.saved = (status_code, body)
+
+
+class IdempotencyStore:
+    """
+    Armazena a resposta de requisições identificadas pelo header `Idempotency-Key`.
+
+    A tabela `idempotency_keys` é compartilhada entre processos; um cache em memória na frente
+    dela permite devolver repetições sem consultar o banco. Requisições duplicadas concorrentes
+    no mesmo processo aguardam a primeira via `threading.Event`; entre processos, a linha
+    "em andamento" funciona como trava e as demais consultam o banco até a conclusão.
+
+    A trava vale até `locked_until`: se o processo morrer antes de concluir, a transação com a
+    entidade e a resposta é desfeita por inteiro e, vencido o prazo, uma nova tentativa com a
+    mesma chave retoma a linha e processa a requisição. O corpo é identificado por um HMAC com
+    `SECRET_KEY`, de modo que a tabela não guarda um hash simples de dados sensíveis.
+    """
+
+    def __init__(self, ttl_seconds: float, wait_seconds: float, lock_seconds: float,
+                 max_cached: int = 10_000):
+        self.ttl_seconds = ttl_seconds
+        self.wait_seconds = wait_seconds
+        self.lock_seconds = lock_seconds
+        self.max_cached = max_cached
+        self._cache: Dict[str, Tuple[float, str, int, Any]] = {}
+        self._inflight: Dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def begin(self, db: Session, scope: str, key: Optional[str], payload: Any) -> Iterator[IdempotentRequest]:
+        if not key:
+            yield IdempotentRequest(self, db)
+            return
+
+        full_key = f"{scope}:{key}"
+        request_hash = hmac.new(
+            settings.SECRET_KEY.encode(),
+            json.dumps(payload, sort_keys=True, default=str).encode(),
+            hashlib.sha256,
+        ).hexdigest()
+
+        replay = self._from_cache(full_key, request_hash)
+        if replay is not None:
+            yield IdempotentRequest(self, db, replay=replay)
+            return
+
+        with self._lock:
+            event = self._inflight.get(full_key)
+            owner = event is None
+            if owner:
+                event = self._inflight[full_key] = threading.Event()
+
+        if not owner:
+            finished = event.wait(self.wait_seconds)
+            replay = self._from_cache(full_key, request_hash)
+            if replay is None:
+                # Terminada sem resposta registrada, a requisição original falhou e liberou a chave
+                raise self._original_failed() if finished else self._conflict()
+            yield IdempotentRequest(self, db, replay=replay)
+            return
+
+        try:
+            replay = self._claim(db, full_key, request_hash)
+            if replay is not None:
+                yield IdempotentRequest(self, db, replay=replay)
+                return
+            request = IdempotentRequest(self, db, full_key, request_hash)
+            try:
+                yield request
+                # Confirma a resposta caso o handler não tenha feito o commit
+                db.commit()
+            except BaseException:
+                db.rollback()
+                self._release(db, full_key)
+                raise
+            if request.saved is None:
+                self._release(db, full_key)
+            else:
+                self._cache_put(full_key, request_hash, *request.saved)
+        finally:
+            with self._lock:
+                self._inflight.pop(full_key, None)
+            event.set()
+
+    def _claim(self, db: Session, full_key: str, request_hash: str) -> Optional[JSONResponse]:
+        """Reserva a chave no banco ou devolve a resposta já registrada por outro processo."""
+        deadline = time.monotonic() + self.wait_seconds
+        while True:
+            now = datetime.now(timezone.utc)
+            locked_until = now + timedelta(seconds=self.lock_seconds)
+            row = db.query(IdempotencyKey).filter(IdempotencyKey.key == full_key).first()
+            if row is not None and row.expires_at <= now:
+                db.delete(row)
+                db.commit()
+                row = None
+            if row is None:
+                db.add(IdempotencyKey(
+                    key=full_key,
+                    request_hash=request_hash,
+                    locked_until=locked_until,
+                    expires_at=now + timedelta(seconds=self.ttl_seconds),
+                ))
+                try:
+                    db.commit()
+                    return None
+                except IntegrityError:
+                    db.rollback()
+                    continue
+            if row.request_hash != request_hash:
+                raise self._mismatch()
+            if row.status_code is not None:
+                self._cache_put(full_key, request_hash, row.status_code, row.response)
+                return self._replay(row.status_code, row.response)
+            if row.locked_until is None or row.locked_until <= now:
+                # Requisição original abandonada (processo encerrado antes do commit): retoma a chave
+                if row.locked_until is None:
+                    same_lease = IdempotencyKey.locked_until.is_(None)
+                else:
+                    same_lease = IdempotencyKey.locked_until == row.locked_until
+                reclaimed = db.query(IdempotencyKey).filter(
+                    IdempotencyKey.key == full_key,
+                    IdempotencyKey.status_code.is_(None),
+                    same_lease
+                ).update({IdempotencyKey.locked_until: locked_until}, synchronize_session=False)
+                db.commit()
+                if reclaimed:
+                    return None
+                continue
+            if time.monotonic() >= deadline:
+                raise self._conflict()
+            db.expire(row)
+            time.sleep(_POLL_INTERVAL)
+
+    def _complete(self, db: Session, full_key: str, status_code: int, body: Any) -> None:
+        db.query(IdempotencyKey).filter(IdempotencyKey.key == full_key).update(
+            {IdempotencyKey.status_code: status_code, IdempotencyKey.response: body,
+             IdempotencyKey.locked_until: None},
+            synchronize_session=False
+        )
+
+    @staticmethod
+    def _release(db: Session, full_key: str) -> None:
+        # Libera a chave não concluída para que o cliente possa tentar novamente
+        db.query(IdempotencyKey).filter(
+            IdempotencyKey.key == full_key, IdempotencyKey.status_code.is_(None)
+        ).delete()
+        db.commit()
+
+    def _from_cache(self, full_key: str, request_hash: str) -> Optional[JSONResponse]:
+        entry = self._cache.get(full_key)
+        if entry is None:
+            return None
+        expires, cached_hash, status_code, body = entry
+        if expires <= time.monotonic():
+            self._cache.pop(full_key, None)
+            return None
+        if cached_hash != request_hash:
+            raise self._mismatch()
+        return self._replay(status_code, body)
+
+    def _cache_put(self, full_key: str, request_hash: str, status_code: int, body: Any) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._cache) >= self.max_cached:
+                for k in [k for k, entry in self._cache.items() if entry[0] <= now]:
+                    del self._cache[k]
+                if len(self._cache) >= self.max_cached:
+                    self._cache.clear()
+            self._cache[full_key] = (now + self.ttl_seconds, request_hash, status_code, body)
+
+    @staticmethod
+    def _replay(status_code: int, body: Any) -> JSONResponse:
+        return JSONResponse(status_code=status_code, content=body, headers={"Idempotent-Replayed": "true"})
+
+    @staticmethod
+    def _conflict() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A request with this Idempotency-Key is still being processed",
+        )
+
+    @staticmethod
+    def _original_failed() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="The original request with this Idempotency-Key failed; retry the request",
+        )
+
+    @staticmethod
+    def _mismatch() -> HTTPException:
+        return HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail="Idempotency-Key was already used with a different request body",
+        )
+
+    def purge_expired(self, db: Session) -> int:
+        now = datetime.now(timezone.utc)
+        deleted = db.query(IdempotencyKey).filter(IdempotencyKey.expires_at <= now).delete()
+        db.commit()
+        return deleted
+
+
+idempotency_store = IdempotencyStore(
+    ttl_seconds=settings.IDEMPOTENCY_TTL_SECONDS,
+    wait_seconds=settings.IDEMPOTENCY_WAIT_SECONDS,
+    lock_seconds=settings.IDEMPOTENCY_LOCK_SECONDS,
+)
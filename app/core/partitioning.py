@@ -0,0 +1,205 @@
+"""
+Particionamento mensal da tabela `collections` por `date` (particionamento nativo do PostgreSQL).
+
+Cada mês fica numa partição `collections_yYYYYmMM` com intervalo `[1º dia do mês, 1º dia do
+mês seguinte)`, e uma partição `collections_default` recebe datas fora das partições criadas.
+Consultas com filtro em `date` (como as de coletas pendentes recentes) acessam apenas as
+partições do período; partições antigas podem ser arquivadas e removidas sem `DELETE` em massa
+nem vacuum na tabela inteira.
+
+Migração: crie uma revisão com `alembic revision -m "partition collections"` e chame
+`upgrade(op.get_bind())` e `downgrade(op.get_bind())` nas funções correspondentes.
+"""
+import gzip
+import os
+import re
+from datetime import date
+from typing import List, Optional, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+
+TABLE = "collections"
+DEFAULT_PARTITION = f"{TABLE}_default"
+_PARTITION_RE = re.compile(rf"^{TABLE}_y(\d{{4}})m(\d{{2}})$")
+
+# Índices da tabela particionada (criados em cada partição automaticamente)
+_INDEXES = [
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_id ON {TABLE} (id)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_user_id_change_xid ON {TABLE} (user_id, change_xid, change_seq)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_status_date ON {TABLE} (status, date)",
+    f"CREATE INDEX IF NOT EXISTS ix_{TABLE}_change_xid ON {TABLE} (change_xid)",
+]
+
+
+def month_start(d: date) -> date:
+    return date(d.year, d.month, 1)
+
+
+def add_months(d: date, months: int) -> date:
+    index = d.year * 12 + d.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{TABLE}_y{month.year:04d}m{month.month:02d}"
+
+
+def ensure_partitions(conn: Connection, start: date, end: date) -> List[str]:
+    """
+    Cria as partições mensais de `start` até `end` (inclusive) que ainda não existem.
+
+    Coletas do mês que já estejam na partição padrão (datas sem partição mensal na época da
+    criação) são movidas para a nova partição; do contrário o PostgreSQL recusaria a partição.
+    """
+    created = []
+    has_default = conn.execute(text("SELECT to_regclass(:name)"), {"name": DEFAULT_PARTITION}).scalar()
+    month = month_start(start)
+    while month <= end:
+        name = partition_name(month)
+        exists = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if exists is None:
+            bounds = f"FROM ('{month.isoformat()}') TO ('{add_months(month, 1).isoformat()}')"
+            if has_default is None:
+                conn.execute(text(f"CREATE TABLE {name} PARTITION OF {TABLE} FOR VALUES {bounds}"))
+            else:
+                _create_from_default(conn, name, month)
+                conn.execute(text(f"ALTER TABLE {TABLE} ATTACH PARTITION {name} FOR VALUES {bounds}"))
+            created.append(name)
+        month = add_months(month, 1)
+    return created
+
+
+def _create_from_default(conn: Connection, name: str, month: date) -> None:
+    # Novas escritas na partição padrão ficam bloqueadas até o fim da transação, para que
+    # nenhuma linha do mês chegue entre a cópia e o ATTACH
+    conn.execute(text(f"LOCK TABLE {DEFAULT_PARTITION} IN EXCLUSIVE MODE"))
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    conn.execute(text(
+        f"WITH moved AS ("
+        f"DELETE FROM {DEFAULT_PARTITION} WHERE date >= :start AND date < :end RETURNING *"
+        f") INSERT INTO {name} SELECT * FROM moved"
+    ), {"start": month, "end": add_months(month, 1)})
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    """Partições mensais existentes, em ordem cronológica, com o mês de cada uma."""
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "JOIN pg_class p ON p.oid = i.inhparent "
+        "WHERE p.relname = :table"
+    ), {"table": TABLE}).scalars()
+    partitions = []
+    for name in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def upgrade(conn: Connection, months_ahead: int = 3) -> None:
+    """
+    Converte `collections` numa tabela particionada por mês, preservando dados, ids e índices.
+
+    A chave primária passa a ser `(id, date)`, pois o PostgreSQL exige que ela contenha a chave
+    de particionamento; `id` continua único, gerado pela mesma sequência.
+    """
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_legacy"))
+    conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY NONE"))
+    for index in conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+    ), {"table": f"{TABLE}_legacy"}).scalars():
+        conn.execute(text(f'ALTER INDEX "{index}" RENAME TO "{index}_legacy"'))
+
+    conn.execute(text(
+        f"CREATE TABLE {TABLE} (LIKE {TABLE}_legacy INCLUDING DEFAULTS INCLUDING CONSTRAINTS) "
+        f"PARTITION BY RANGE (date)"
+    ))
+    conn.execute(text(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id, date)"))
+    conn.execute(text(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)"
+    ))
+    for statement in _INDEXES:
+        conn.execute(text(statement))
+    conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+
+    bounds = conn.execute(text(f"SELECT min(date), max(date) FROM {TABLE}_legacy")).one()
+    today = date.today()
+    first = month_start(bounds[0].date()) if bounds[0] else month_start(today)
+    last = max(bounds[1].date() if bounds[1] else today, add_months(today, months_ahead))
+    ensure_partitions(conn, first, last)
+    conn.execute(text(f"CREATE TABLE {DEFAULT_PARTITION} PARTITION OF {TABLE} DEFAULT"))
+
+    conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_legacy"))
+    conn.execute(text(f"DROP TABLE {TABLE}_legacy"))
+
+
+def downgrade(conn: Connection) -> None:
+    """Volta `collections` para uma tabela comum com os dados das partições ainda existentes."""
+    conn.execute(text(f"ALTER TABLE {TABLE} RENAME TO {TABLE}_partitioned"))
+    conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY NONE"))
+    for index in (f"{TABLE}_pkey", f"ix_{TABLE}_id", f"ix_{TABLE}_user_id_change_xid", f"ix_{TABLE}_status_date",
+                  f"ix_{TABLE}_change_xid"):
+        conn.execute(text(f"ALTER INDEX IF EXISTS {index} RENAME TO {index}_partitioned"))
+    conn.execute(text(
+        f"CREATE TABLE {TABLE} (LIKE {TABLE}_partitioned INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"
+    ))
+    conn.execute(text(f"INSERT INTO {TABLE} SELECT * FROM {TABLE}_partitioned"))
+    conn.execute(text(f"DROP TABLE {TABLE}_partitioned"))
+    conn.execute(text(f"ALTER TABLE {TABLE} ADD PRIMARY KEY (id)"))
+    conn.execute(text(
+        f"ALTER TABLE {TABLE} ADD CONSTRAINT {TABLE}_user_id_fkey FOREIGN KEY (user_id) REFERENCES users (id)"
+    ))
+    conn.execute(text(f"CREATE INDEX ix_{TABLE}_id ON {TABLE} (id)"))
+    conn.execute(text(f"CREATE INDEX ix_{TABLE}_user_id_change_xid ON {TABLE} (user_id, change_xid, change_seq)"))
+    conn.execute(text(f"CREATE INDEX ix_{TABLE}_status_date ON {TABLE} (status, date)"))
+    conn.execute(text(f"CREATE INDEX ix_{TABLE}_change_xid ON {TABLE} (change_xid)"))
+    conn.execute(text(f"ALTER SEQUENCE {TABLE}_id_seq OWNED BY {TABLE}.id"))
+
+
+def _copy_csv(conn: Connection, name: str, fileobj) -> None:
+    # COPY é muito mais rápido que ler linha a linha pelo ORM
+    with conn.connection.cursor() as cursor:
+        cursor.copy_expert(f"COPY {name} TO STDOUT WITH (FORMAT csv, HEADER true)", fileobj)
+
+
+def archive_partition(conn: Connection, name: str, output_dir: str, fmt: str = "csv") -> str:
+    """
+    Exporta uma partição para `output_dir` (`csv` comprimido com gzip ou `parquet`), registra
+    a exclusão das coletas em `tombstones`, desanexa a partição de `collections` e a remove, na
+    transação de `conn`. Retorna o caminho do arquivo gerado.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    if fmt == "parquet":
+        try:
+            import pyarrow.csv as pa_csv
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("O formato parquet requer o pacote opcional 'pyarrow'.") from e
+        csv_path = os.path.join(output_dir, f"{name}.csv")
+        with open(csv_path, "wb") as f:
+            _copy_csv(conn, name, f)
+        path = os.path.join(output_dir, f"{name}.parquet")
+        pq.write_table(pa_csv.read_csv(csv_path), path, compression="zstd")
+        os.remove(csv_path)
+    elif fmt == "csv":
+        path = os.path.join(output_dir, f"{name}.csv.gz")
+        with gzip.open(path, "wb") as f:
+            _copy_csv(conn, name, f)
+    else:
+        raise ValueError(f"Formato de arquivo desconhecido: {fmt}")
+
+    # Clientes de `GET /sync` removem as coletas arquivadas, como qualquer exclusão
+    conn.execute(text(
+        f"INSERT INTO tombstones (entity, entity_id, owner_id) SELECT '{TABLE}', id, user_id FROM {name}"
+    ))
+    conn.execute(text(f"ALTER TABLE {TABLE} DETACH PARTITION {name}"))
+    conn.execute(text(f"DROP TABLE {name}"))
+    return path
+
+
+def expired_partitions(conn: Connection, retention_months: int, today: Optional[date] = None) -> List[str]:
+    """Partições cujo mês inteiro é anterior à janela de retenção."""
+    cutoff = add_months(month_start(today or date.today()), -retention_months)
+    return [name for name, month in list_partitions(conn) if month < cutoff]
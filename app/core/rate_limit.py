@@ -0,0 +1,166 @@
+import logging
+import math
+import threading
+import time
+from typing import Dict, List, Optional, Tuple
+
+from app.core.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class MemoryStore:
+    """
+    Token buckets mantidos no próprio processo.
+
+    Cada chave guarda `[tokens, último_refill]`. Quando o número de chaves atinge `max_keys`,
+    buckets ociosos há mais de `idle_seconds` são descartados, limitando o uso de memória.
+    """
+
+    def __init__(self, max_keys: int = 100_000, idle_seconds: float = 3600):
+        self.max_keys = max_keys
+        self.idle_seconds = idle_seconds
+        self._buckets: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> Tuple[bool, float]:
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                if len(self._buckets) >= self.max_keys:
+                    self._evict_idle(now)
+                bucket = self._buckets[key] = [float(capacity), now]
+            else:
+                bucket[0] = min(capacity, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+            if bucket[0] >= cost:
+                bucket[0] -= cost
+                return True, 0.0
+            return False, (cost - bucket[0]) / rate
+
+    def _evict_idle(self, now: float) -> None:
+        # Um bucket parado tempo suficiente para encher equivale a um bucket novo
+        idle = [key for key, (_, last) in self._buckets.items() if now - last > self.idle_seconds]
+        for key in idle:
+            del self._buckets[key]
+        if len(self._buckets) >= self.max_keys:
+            self._buckets.clear()
+
+
+# Executado atomicamente pelo Redis; usa o relógio do servidor Redis para que todas as
+# instâncias da API compartilhem a mesma referência de tempo.
+TOKEN_BUCKET_SCRIPT = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local cost = tonumber(ARGV[3])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1])
+local ts = tonumber(state[2])
+if tokens == nil then
+    tokens = capacity
+    ts = now
+end
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= cost then
+    tokens = tokens - cost
+    allowed = 1
+else
+    retry_after = (cost - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+
+class RedisStore:
+    """
+    Token buckets compartilhados entre processos via Redis (ou compatível).
+
+    Requer o pacote opcional `redis`. Se o Redis estiver inacessível (ou não responder em
+    `RATE_LIMIT_REDIS_TIMEOUT_SECONDS`), os limites passam a ser aplicados por processo
+    (`MemoryStore`), em vez de falhar a requisição; o Redis só volta a ser consultado após
+    `RATE_LIMIT_REDIS_RETRY_SECONDS`, para que um host inalcançável não atrase cada requisição.
+    """
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError(
+                "RATE_LIMIT_REDIS_URL configurado, mas o pacote 'redis' não está instalado."
+            ) from e
+        self.prefix = prefix
+        timeout = settings.RATE_LIMIT_REDIS_TIMEOUT_SECONDS
+        self._client = redis.Redis.from_url(url, socket_connect_timeout=timeout, socket_timeout=timeout)
+        self._script = self._client.register_script(TOKEN_BUCKET_SCRIPT)
+        self._errors = redis.RedisError
+        self._fallback = MemoryStore()
+        self._retry_at: Optional[float] = None  # Enquanto definido, o Redis é considerado indisponível
+
+    def consume(self, key: str, capacity: int, rate: float, cost: int = 1) -> Tuple[bool, float]:
+        if self._retry_at is not None and time.monotonic() < self._retry_at:
+            return self._fallback.consume(key, capacity, rate, cost)
+        try:
+            allowed, retry_after = self._script(keys=[self.prefix + key], args=[capacity, rate, cost])
+        except self._errors as e:
+            if self._retry_at is None:
+                logger.error("Redis indisponível para o rate limiting; usando limites por processo: %s", e)
+            self._retry_at = time.monotonic() + settings.RATE_LIMIT_REDIS_RETRY_SECONDS
+            return self._fallback.consume(key, capacity, rate, cost)
+        if self._retry_at is not None:
+            self._retry_at = None
+            logger.info("Redis disponível novamente para o rate limiting")
+        return bool(allowed), float(retry_after)
+
+
+class TokenBucket:
+    """
+    Limite de `capacity` requisições com reposição contínua de `capacity / period` tokens
+    por segundo.
+    """
+
+    def __init__(self, name: str, capacity: int, period: float, store=None):
+        self.name = name
+        self.capacity = capacity
+        self.rate = capacity / period
+        self._store = store
+
+    @property
+    def store(self):
+        return self._store or get_store()
+
+    def hit(self, identity: str) -> Tuple[bool, int]:
+        """Consome um token; retorna se foi permitido e o `Retry-After` em segundos."""
+        allowed, retry_after = self.store.consume(f"{self.name}:{identity}", self.capacity, self.rate)
+        return allowed, 0 if allowed else max(1, math.ceil(retry_after))
+
+    def acquire(self, identity: str, timeout: float) -> bool:
+        """Aguarda até `timeout` segundos por um token; retorna se conseguiu consumi-lo."""
+        deadline = time.monotonic() + timeout
+        while True:
+            allowed, retry_after = self.store.consume(f"{self.name}:{identity}", self.capacity, self.rate)
+            if allowed:
+                return True
+            remaining = deadline - time.monotonic()
+            if retry_after > remaining:
+                return False
+            time.sleep(retry_after)
+
+
+_store = None
+
+
+def get_store():
+    global _store
+    if _store is None:
+        if settings.RATE_LIMIT_REDIS_URL:
+            _store = RedisStore(settings.RATE_LIMIT_REDIS_URL)
+        else:
+            _store = MemoryStore()
+    return _store
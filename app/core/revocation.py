@@ -0,0 +1,85 @@
+import threading
+import time
+from datetime import datetime, timezone
+from typing import FrozenSet, Optional
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.revoked_token import RevokedToken
+
+
+class RevocationList:
+    """
+    Cópia em memória dos `jti` revogados ainda não expirados.
+
+    A verificação por requisição é apenas um teste de pertinência num `frozenset`, sem acesso
+    ao banco. A tabela `revoked_tokens` é a fonte da verdade: o conjunto é recarregado a cada
+    `sync_interval` segundos, o que propaga revogações feitas por outros workers. Como apenas
+    tokens ainda válidos são carregados, o conjunto fica limitado pela duração dos tokens.
+    """
+
+    def __init__(self, sync_interval: float):
+        self.sync_interval = sync_interval
+        self._revoked: FrozenSet[str] = frozenset()
+        self._next_sync = 0.0
+        self._lock = threading.Lock()
+
+    def is_revoked(self, jti: str) -> bool:
+        return jti in self._revoked
+
+    def maybe_sync(self, db: Session) -> None:
+        if time.monotonic() < self._next_sync:
+            return
+        # Apenas uma thread recarrega; as demais seguem com o conjunto atual
+        if not self._lock.acquire(blocking=False):
+            return
+        try:
+            self._reload(db)
+        finally:
+            self._lock.release()
+
+    def sync(self, db: Session) -> None:
+        with self._lock:
+            self._reload(db)
+
+    def _reload(self, db: Session) -> None:
+        # Chamado com `_lock` adquirido: uma revogação local concorrente espera a troca do
+        # conjunto, em vez de ser sobrescrita por um snapshot lido antes dela
+        now = datetime.now(timezone.utc)
+        rows = db.query(RevokedToken.jti).filter(RevokedToken.expires_at > now).all()
+        self._revoked = frozenset(row.jti for row in rows)
+        self._next_sync = time.monotonic() + self.sync_interval
+
+    def revoke(self, db: Session, jti: str, exp: Optional[int]) -> bool:
+        """
+        Revoga o token. Retorna False se ele já estava revogado.
+
+        A verificação usa a restrição única de `jti` no banco, e não o conjunto em memória:
+        entre revogações concorrentes do mesmo token, em qualquer processo, apenas uma retorna True.
+        """
+        if exp is not None:
+            expires_at = datetime.fromtimestamp(exp, tz=timezone.utc)
+        else:
+            expires_at = datetime.now(timezone.utc)
+        db.add(RevokedToken(jti=jti, expires_at=expires_at))
+        try:
+            db.commit()
+            inserted = True
+        except IntegrityError:
+            # Token já revogado anteriormente
+            db.rollback()
+            inserted = False
+        with self._lock:
+            self._revoked = self._revoked | {jti}
+        return inserted
+
+    def purge_expired(self, db: Session) -> int:
+        now = datetime.now(timezone.utc)
+        deleted = db.query(RevokedToken).filter(RevokedToken.expires_at <= now).delete()
+        db.commit()
+        return deleted
+
+
+revocation_list = RevocationList(sync_interval=settings.TOKEN_REVOCATION_SYNC_SECONDS)
@@ -1,26 +1,62 @@
+import uuid
 from datetime import datetime, timedelta
+from functools import lru_cache
 from typing import Any, Union
-from jose import jwt
-from passlib.context import CryptContext
 from app.core.config import settings
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# `jose` e `passlib` (bcrypt) são importados sob demanda para não pesar na inicialização:
+# a maioria das requisições só precisa de `decode_token`, e o hash de senha só é usado no
+# login e no cadastro.
+
+ACCESS_TOKEN_TYPE = "access"
+REFRESH_TOKEN_TYPE = "refresh"
+
+
+class InvalidTokenError(ValueError):
+    """Token com assinatura inválida, expirado ou malformado."""
+
+
+@lru_cache(maxsize=None)
+def get_pwd_context():
+    from passlib.context import CryptContext
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _create_token(subject: Union[str, Any], token_type: str, expires_delta: timedelta) -> str:
+    from jose import jwt
+    expire = datetime.utcnow() + expires_delta
+    to_encode = {
+        "exp": expire,
+        "sub": str(subject),
+        "jti": uuid.uuid4().hex,
+        "type": token_type,
+    }
+    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
+    return encoded_jwt
 
 def create_access_token(
     subject: Union[str, Any], expires_delta: timedelta = None
 ) -> str:
-    if expires_delta:
-        expire = datetime.utcnow() + expires_delta
-    else:
-        expire = datetime.utcnow() + timedelta(
-            minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES
-        )
-    to_encode = {"exp": expire, "sub": str(subject)}
-    encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm="HS256")
-    return encoded_jwt
+    if not expires_delta:
+        expires_delta = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
+    return _create_token(subject, ACCESS_TOKEN_TYPE, expires_delta)
+
+def create_refresh_token(
+    subject: Union[str, Any], expires_delta: timedelta = None
+) -> str:
+    if not expires_delta:
+        expires_delta = timedelta(minutes=settings.REFRESH_TOKEN_EXPIRE_MINUTES)
+    return _create_token(subject, REFRESH_TOKEN_TYPE, expires_delta)
+
+def decode_token(token: str) -> dict:
+    from jose import jwt, JWTError
+    try:
+        return jwt.decode(token, settings.SECRET_KEY, algorithms=settings.ALGORITHM)
+    except JWTError as e:
+        raise InvalidTokenError(str(e)) from e
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return get_pwd_context().verify(plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
\ No newline at end of file
+    return get_pwd_context().hash(password)
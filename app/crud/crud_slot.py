@@ -0,0 +1,152 @@
+from datetime import date, time
+from typing import Dict
+
+from sqlalchemy import Date, case, cast, func, literal, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.collection import Collection, CollectionStatus
+from app.models.collection_slot import CollectionSlot
+from app.utils.slots import parse_time_window, window_slots, zone_for
+
+# Coluna do contador correspondente a cada status de coleta
+_STATUS_COLUMN = {
+    CollectionStatus.pending: "pending",
+    CollectionStatus.collected: "collected",
+}
+
+
+def book(db: Session, *, zone: str, day: date, slot_start: time,
+         status: CollectionStatus = CollectionStatus.pending, enforce: bool = True) -> bool:
+    """
+    Reserva uma vaga na janela, sem commit (a reserva faz parte da transação da coleta).
+
+    O incremento é um único `INSERT ... ON CONFLICT DO UPDATE ... WHERE ocupadas < capacidade`,
+    que trava a linha do contador: reservas simultâneas na mesma janela são serializadas pelo
+    banco e nunca ultrapassam a capacidade. Retorna False se a janela estiver cheia.
+    """
+    column = _STATUS_COLUMN[status]
+    counter = getattr(CollectionSlot, column)
+    values = {"zone": zone, "date": day, "slot_start": slot_start, "capacity": settings.SLOT_CAPACITY,
+              "pending": 0, "collected": 0}
+    values[column] = 1
+    stmt = insert(CollectionSlot).values(**values)
+    stmt = stmt.on_conflict_do_update(
+        constraint="uq_collection_slots_zone_date_slot",
+        set_={column: counter + 1},
+        where=(CollectionSlot.pending + CollectionSlot.collected < CollectionSlot.capacity) if enforce else None,
+    ).returning(CollectionSlot.id)
+    return db.execute(stmt).first() is not None
+
+
+def move(db: Session, *, zone: str, day: date, slot_start: time,
+         old_status: CollectionStatus, new_status: CollectionStatus) -> None:
+    """Transfere uma coleta entre os contadores de status da janela, sem commit."""
+    if old_status == new_status:
+        return
+    old_column = getattr(CollectionSlot, _STATUS_COLUMN[old_status])
+    new_column = getattr(CollectionSlot, _STATUS_COLUMN[new_status])
+    db.query(CollectionSlot).filter(
+        CollectionSlot.zone == zone,
+        CollectionSlot.date == day,
+        CollectionSlot.slot_start == slot_start
+    ).update({old_column: old_column - 1, new_column: new_column + 1}, synchronize_session=False)
+
+
+def get_day(db: Session, *, zone: str, day: date) -> Dict[time, CollectionSlot]:
+    rows = db.query(CollectionSlot).filter(
+        CollectionSlot.zone == zone,
+        CollectionSlot.date == day
+    ).all()
+    return {row.slot_start: row for row in rows}
+
+
+def book_collection(db: Session, collection: Collection, *, enforce: bool = True) -> bool:
+    """
+    Reserva a vaga da coleta na sua zona e registra zona/janela na coleta.
+
+    Um horário que abrange várias janelas ("manhã", "08:00-12:00") ocupa a menos ocupada delas,
+    para que as reservas se distribuam pelo período. Retorna False se todas estiverem cheias.
+    Coletas sem coordenadas ou sem janela de horário não são contabilizadas.
+    """
+    if collection.latitude is None or collection.window_start is None:
+        return True
+    zone = zone_for(collection.latitude, collection.longitude)
+    day = collection.date.date()
+    candidates = window_slots(collection.window_start, collection.window_end or collection.window_start)
+    if len(candidates) > 1:
+        counters = get_day(db, zone=zone, day=day)
+        candidates.sort(key=lambda s: counters[s].pending + counters[s].collected if s in counters else 0)
+    for slot_start in candidates:
+        if book(db, zone=zone, day=day, slot_start=slot_start,
+                status=collection.status or CollectionStatus.pending, enforce=enforce):
+            collection.zone = zone
+            collection.slot_start = slot_start
+            return True
+    return False
+
+
+def update_collection_status(db: Session, collection: Collection, new_status: CollectionStatus) -> None:
+    """Atualiza o status da coleta e os contadores da sua janela na mesma transação."""
+    if collection.zone is not None:
+        move(db, zone=collection.zone, day=collection.date.date(), slot_start=collection.slot_start,
+             old_status=collection.status, new_status=new_status)
+    collection.status = new_status
+
+
+def backfill(db: Session, batch_size: int = 1000) -> int:
+    """
+    Preenche janela, zona e vaga das coletas criadas antes da contabilização de vagas, sem commit.
+
+    Coletas cujo `time` não corresponde a uma janela continuam sem vaga; as de horário que abrange
+    várias janelas são distribuídas entre elas pelo id. Retorna quantas coletas passaram a ser
+    contabilizadas; os contadores devem ser recalculados em seguida com `recount`.
+    """
+    updated, last_id = 0, 0
+    while True:
+        batch = db.query(Collection).filter(
+            Collection.id > last_id,
+            Collection.zone.is_(None),
+            Collection.slot_rejected.is_(False),
+            Collection.latitude.isnot(None)
+        ).order_by(Collection.id).limit(batch_size).all()
+        if not batch:
+            return updated
+        for collection in batch:
+            last_id = collection.id
+            if collection.window_start is None:
+                try:
+                    collection.window_start, collection.window_end = parse_time_window(collection.time)
+                except ValueError:
+                    continue
+            candidates = window_slots(collection.window_start, collection.window_end or collection.window_start)
+            collection.zone = zone_for(collection.latitude, collection.longitude)
+            collection.slot_start = candidates[collection.id % len(candidates)]
+            updated += 1
+        db.flush()
+
+
+def recount(db: Session) -> None:
+    """
+    Recalcula os contadores de `collection_slots` a partir das coletas, sem commit.
+
+    A tabela de contadores fica travada até o commit, para que reservas simultâneas não se
+    percam entre a contagem e a gravação. Capacidades ajustadas manualmente são preservadas.
+    """
+    db.execute(text(f"LOCK TABLE {CollectionSlot.__tablename__} IN EXCLUSIVE MODE"))
+    db.query(CollectionSlot).update({CollectionSlot.pending: 0, CollectionSlot.collected: 0},
+                                    synchronize_session=False)
+    day = cast(Collection.date, Date)
+    counts = db.query(
+        Collection.zone, day, Collection.slot_start, literal(settings.SLOT_CAPACITY),
+        func.count(case((Collection.status == CollectionStatus.pending, 1))),
+        func.count(case((Collection.status == CollectionStatus.collected, 1))),
+    ).filter(Collection.zone.isnot(None)).group_by(Collection.zone, day, Collection.slot_start)
+    stmt = insert(CollectionSlot).from_select(
+        ["zone", "date", "slot_start", "capacity", "pending", "collected"], counts
+    )
+    db.execute(stmt.on_conflict_do_update(
+        constraint="uq_collection_slots_zone_date_slot",
+        set_={"pending": stmt.excluded.pending, "collected": stmt.excluded.collected},
+    ))
@@ -0,0 +1,23 @@
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.tombstone import Tombstone
+
+# Folga além da validade dos tokens de sincronização: `deleted_at` é o início da transação que
+# excluiu o registro, que pode ser anterior ao token que ainda não a incluía
+_PURGE_MARGIN = timedelta(days=1)
+
+
+def purge_expired(db: Session) -> int:
+    """
+    Remove as exclusões registradas há mais de `TOMBSTONE_RETENTION_DAYS` (mais uma folga).
+
+    Tokens de sincronização mais antigos que a retenção provocam uma sincronização completa
+    (ver `GET /sync`), portanto nenhum cliente depende das exclusões removidas.
+    """
+    before = datetime.now(timezone.utc) - timedelta(days=settings.TOMBSTONE_RETENTION_DAYS) - _PURGE_MARGIN
+    deleted = db.query(Tombstone).filter(Tombstone.deleted_at < before).delete(synchronize_session=False)
+    db.commit()
+    return deleted
@@ -7,7 +7,7 @@ from app.schemas.user import UserCreate
 def get_by_email(db: Session, email: str) -> Optional[User]:
     return db.query(User).filter(User.email == email).first()
 
-def create(db: Session, *, obj_in: UserCreate) -> User:
+def create(db: Session, *, obj_in: UserCreate, commit: bool = True) -> User:
     db_obj = User(
         email=obj_in.email,
         hashed_password=get_password_hash(obj_in.password),
@@ -18,7 +18,10 @@ def create(db: Session, *, obj_in: UserCreate) -> User:
         document=obj_in.document
     )
     db.add(db_obj)
-    db.commit()
+    if commit:
+        db.commit()
+    else:
+        db.flush()
     db.refresh(db_obj)
     return db_obj
 
@@ -0,0 +1,170 @@
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Callable, Dict, Iterable, Optional
+
+from sqlalchemy import and_, func, or_
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.models.job import Job, JobStatus
+
+
+@dataclass
+class JobType:
+    name: str
+    handler: Callable[[Session, dict], None]
+    concurrency: int
+    max_attempts: int
+
+
+JOB_TYPES: Dict[str, JobType] = {}
+
+
+def job(name: str, concurrency: int = 1, max_attempts: int = 5) -> Callable:
+    """
+    Registra `handler(db, payload)` como executor dos jobs do tipo `name`.
+
+    `concurrency` limita quantos jobs desse tipo cada processo worker executa ao mesmo tempo.
+    """
+    def decorator(handler: Callable[[Session, dict], None]) -> Callable[[Session, dict], None]:
+        JOB_TYPES[name] = JobType(name, handler, concurrency, max_attempts)
+        return handler
+    return decorator
+
+
+def enqueue(db: Session, job_type: str, payload: dict, max_attempts: Optional[int] = None,
+            run_at: Optional[datetime] = None) -> Job:
+    """
+    Adiciona um job à sessão, sem commit: ele é gravado na mesma transação do handler que o
+    criou, de modo que o job só existe se os dados dos quais depende também existirem.
+    """
+    if max_attempts is None:
+        registered = JOB_TYPES.get(job_type)
+        max_attempts = registered.max_attempts if registered else 5
+    job_row = Job(type=job_type, payload=payload, status=JobStatus.queued, attempts=0,
+                  max_attempts=max_attempts, run_at=run_at or datetime.now(timezone.utc))
+    db.add(job_row)
+    return job_row
+
+
+def claim(db: Session, job_types: Iterable[str]) -> Optional[Job]:
+    """
+    Reserva o próximo job pronto de um dos tipos informados.
+
+    `FOR UPDATE SKIP LOCKED` permite que vários workers consultem a fila ao mesmo tempo sem
+    bloquear uns aos outros nem pegar o mesmo job. Jobs em execução há mais de
+    `JOB_TIMEOUT_SECONDS` (worker interrompido) voltam a ser elegíveis se ainda tiverem tentativas;
+    os que já esgotaram `max_attempts` são marcados como falhos.
+    """
+    job_types = list(job_types)
+    if not job_types:
+        return None
+    now = datetime.now(timezone.utc)
+    stale = now - timedelta(seconds=settings.JOB_TIMEOUT_SECONDS)
+    exhausted = db.query(Job).filter(
+        Job.type.in_(job_types),
+        Job.status == JobStatus.running,
+        Job.started_at < stale,
+        Job.attempts >= Job.max_attempts
+    ).update({
+        Job.status: JobStatus.failed,
+        Job.finished_at: now,
+        Job.last_error: "Tempo limite de execução excedido"
+    }, synchronize_session=False)
+    if exhausted:
+        db.commit()
+
+    job_row = db.query(Job).filter(
+        Job.type.in_(job_types),
+        or_(
+            and_(Job.status == JobStatus.queued, Job.run_at <= now),
+            and_(Job.status == JobStatus.running, Job.started_at < stale,
+                 Job.attempts < Job.max_attempts),
+        )
+    ).order_by(Job.run_at).limit(1).with_for_update(skip_locked=True).first()
+    if job_row is None:
+        db.rollback()
+        return None
+    job_row.status = JobStatus.running
+    job_row.attempts += 1
+    job_row.started_at = now
+    db.commit()
+    return job_row
+
+
+def complete(db: Session, job_row: Job) -> None:
+    job_row.status = JobStatus.done
+    job_row.finished_at = datetime.now(timezone.utc)
+    job_row.last_error = None
+    db.commit()
+
+
+def fail(db: Session, job_row: Job, error: str) -> None:
+    """Reagenda o job com backoff exponencial (com jitter) ou o marca como falho."""
+    now = datetime.now(timezone.utc)
+    job_row.last_error = error
+    if job_row.attempts >= job_row.max_attempts:
+        job_row.status = JobStatus.failed
+        job_row.finished_at = now
+    else:
+        delay = min(settings.JOB_BACKOFF_SECONDS * 2 ** (job_row.attempts - 1), settings.JOB_MAX_BACKOFF_SECONDS)
+        job_row.status = JobStatus.queued
+        job_row.run_at = now + timedelta(seconds=delay * random.uniform(0.8, 1.2))
+    db.commit()
+
+
+def purge_finished(db: Session) -> int:
+    """Remove os jobs concluídos ou falhos há mais de `JOB_RETENTION_SECONDS`."""
+    before = datetime.now(timezone.utc) - timedelta(seconds=settings.JOB_RETENTION_SECONDS)
+    deleted = db.query(Job).filter(
+        Job.status.in_([JobStatus.done, JobStatus.failed]),
+        Job.finished_at < before
+    ).delete(synchronize_session=False)
+    db.commit()
+    return deleted
+
+
+def queue_metrics(db: Session, window_minutes: int = 60) -> dict:
+    """
+    Profundidade da fila por tipo e status, e latências dos jobs concluídos na janela:
+    espera (`started_at - run_at`, aproximada para jobs reexecutados) e execução
+    (`finished_at - started_at`).
+    """
+    depth: Dict[str, Dict[str, int]] = {}
+    rows = db.query(Job.type, Job.status, func.count(Job.id)).filter(
+        Job.status.in_([JobStatus.queued, JobStatus.running])
+    ).group_by(Job.type, Job.status).all()
+    for job_type, status, count in rows:
+        depth.setdefault(job_type, {})[status.value] = count
+
+    since = datetime.now(timezone.utc) - timedelta(minutes=window_minutes)
+    wait = func.extract("epoch", Job.started_at - Job.run_at)
+    run = func.extract("epoch", Job.finished_at - Job.started_at)
+    latency = {}
+    rows = db.query(
+        Job.type,
+        func.count(Job.id),
+        func.avg(wait),
+        func.percentile_cont(0.95).within_group(wait),
+        func.avg(run),
+        func.percentile_cont(0.95).within_group(run),
+    ).filter(
+        Job.status == JobStatus.done,
+        Job.finished_at >= since
+    ).group_by(Job.type).all()
+    for job_type, count, wait_avg, wait_p95, run_avg, run_p95 in rows:
+        latency[job_type] = {
+            "completed": count,
+            "wait_avg_seconds": float(wait_avg or 0),
+            "wait_p95_seconds": float(wait_p95 or 0),
+            "run_avg_seconds": float(run_avg or 0),
+            "run_p95_seconds": float(run_p95 or 0),
+        }
+
+    oldest = db.query(func.min(Job.run_at)).filter(
+        Job.status == JobStatus.queued, Job.run_at <= datetime.now(timezone.utc)
+    ).scalar()
+    oldest_age = (datetime.now(timezone.utc) - oldest).total_seconds() if oldest else 0.0
+    return {"depth": depth, "latency": latency, "oldest_ready_age_seconds": oldest_age,
+            "window_minutes": window_minutes}
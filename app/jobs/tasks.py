@@ -0,0 +1,39 @@
+import logging
+
+from sqlalchemy.orm import Session
+
+from app.crud import crud_slot
+from app.jobs.queue import job
+from app.models.collection import Collection
+from app.models.cooperative import Cooperative
+from app.utils.addresses import geocode
+
+logger = logging.getLogger(__name__)
+
+
+def _geocode(db: Session, model, record_id: int) -> None:
+    record = db.query(model).filter(model.id == record_id).first()
+    if record is None or record.latitude is not None:
+        return
+    lat_long = geocode(record.address)
+    if lat_long is None:
+        raise RuntimeError(f"Não foi possível obter coordenadas para '{record.address}'")
+    record.latitude, record.longitude = lat_long
+    if isinstance(record, Collection) and not crud_slot.book_collection(db, record):
+        # A janela lotou enquanto o endereço aguardava a geocodificação: a coleta é mantida, sem
+        # vaga, e sinalizada para que o usuário escolha outro horário
+        record.slot_rejected = True
+        logger.warning("Coleta %s sem vaga: janela '%s' lotada na zona", record.id, record.time)
+    db.commit()
+
+
+# A política de uso do Nominatim permite no máximo uma requisição por segundo; o limite em si é
+# aplicado por `get_lat_long_from_address`, em todos os processos
+@job("geocode_collection", concurrency=1, max_attempts=5)
+def geocode_collection(db: Session, payload: dict) -> None:
+    _geocode(db, Collection, payload["collection_id"])
+
+
+@job("geocode_cooperative", concurrency=1, max_attempts=5)
+def geocode_cooperative(db: Session, payload: dict) -> None:
+    _geocode(db, Cooperative, payload["cooperative_id"])
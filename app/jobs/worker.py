@@ -0,0 +1,93 @@
+import logging
+import signal
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict
+
+from app.core.config import settings
+from app.core.database import SessionLocal
+from app.jobs import tasks  # noqa: F401  Registra os tipos de job
+from app.jobs.queue import JOB_TYPES, claim, complete, fail
+from app.models.job import Job
+from app.utils.addresses import address_index
+
+logger = logging.getLogger(__name__)
+
+
+class Worker:
+    """
+    Consome a fila `jobs` respeitando o limite de concorrência de cada tipo de job.
+
+    Cada job roda numa thread do pool com sua própria sessão de banco. Quando não há jobs
+    prontos, o worker espera `JOB_POLL_SECONDS` antes de consultar a fila novamente.
+    """
+
+    def __init__(self):
+        self._running: Dict[str, int] = {name: 0 for name in JOB_TYPES}
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._executor = ThreadPoolExecutor(max_workers=sum(t.concurrency for t in JOB_TYPES.values()) or 1)
+
+    def stop(self, *args) -> None:
+        self._stop.set()
+
+    def _available_types(self):
+        with self._lock:
+            return [name for name, job_type in JOB_TYPES.items()
+                    if self._running[name] < job_type.concurrency]
+
+    def run(self) -> None:
+        logger.info("Worker iniciado; tipos: %s", ", ".join(JOB_TYPES))
+        while not self._stop.is_set():
+            claimed = None
+            db = SessionLocal()
+            try:
+                job_row = claim(db, self._available_types())
+                if job_row is not None:
+                    claimed = (job_row.id, job_row.type)
+            except Exception:
+                logger.exception("Erro ao consultar a fila de jobs")
+            finally:
+                db.close()
+            if claimed is None:
+                self._stop.wait(settings.JOB_POLL_SECONDS)
+                continue
+            with self._lock:
+                self._running[claimed[1]] += 1
+            self._executor.submit(self._execute, *claimed)
+        self._executor.shutdown(wait=True)
+        logger.info("Worker finalizado")
+
+    def _execute(self, job_id: int, job_type_name: str) -> None:
+        db = SessionLocal()
+        try:
+            job_row = db.query(Job).filter(Job.id == job_id).first()
+            started = time.monotonic()
+            try:
+                JOB_TYPES[job_type_name].handler(db, job_row.payload)
+            except Exception as e:
+                db.rollback()
+                logger.warning("Job %s (%s) falhou na tentativa %s: %s",
+                               job_row.id, job_row.type, job_row.attempts, e)
+                fail(db, job_row, repr(e))
+            else:
+                complete(db, job_row)
+                logger.info("Job %s (%s) concluído em %.3fs", job_row.id, job_row.type,
+                            time.monotonic() - started)
+        except Exception:
+            logger.exception("Erro ao executar o job %s", job_id)
+        finally:
+            with self._lock:
+                self._running[job_type_name] -= 1
+            db.close()
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(levelname)s %(name)s: %(message)s")
+    if settings.ADDRESS_MATCH_ENABLED:
+        address_index.start()
+    worker = Worker()
+    signal.signal(signal.SIGTERM, worker.stop)
+    signal.signal(signal.SIGINT, worker.stop)
+    worker.run()
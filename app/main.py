@@ -1,10 +1,26 @@
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from app.core.config import settings
 from app.api.api_v1.api import api_router
+from app.core.compression import CompressionMiddleware
+from app.utils.addresses import address_index
+from app.utils.heatmap import collection_snapshot
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Os caches em memória são carregados em segundo plano, fora do caminho das requisições
+    if settings.ADDRESS_MATCH_ENABLED:
+        address_index.start()
+    collection_snapshot.start()
+    yield
+
 
 app = FastAPI(title=settings.PROJECT_NAME,
-              description="Ecolink a melhoria dos ganhos financeiros e qualidades de vida dos catadores de material reciclável")
+              description="Ecolink a melhoria dos ganhos financeiros e qualidades de vida dos catadores de material reciclável",
+              lifespan=lifespan)
 
 origins = settings.get_cors_origins()
 
@@ -16,4 +32,6 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+app.add_middleware(CompressionMiddleware, minimum_size=settings.COMPRESSION_MIN_SIZE)
+
 app.include_router(api_router, prefix=settings.API_V1_STR)
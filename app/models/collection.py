@@ -1,6 +1,6 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Enum, JSON, Float
+from sqlalchemy import Column, Integer, BigInteger, Boolean, String, DateTime, ForeignKey, Enum, JSON, Float, Index, Time, DDL, event
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, change_sequence, current_xact_id
 import enum
 
 class CollectionStatus(str, enum.Enum):
@@ -9,15 +9,42 @@ class CollectionStatus(str, enum.Enum):
 
 class Collection(Base):
     __tablename__ = "collections"
+    # Particionada por mês em `date` (ver app/core/partitioning.py); o PostgreSQL exige que a
+    # chave primária inclua a coluna de particionamento, mas `id` continua único
+    __table_args__ = (
+        Index("ix_collections_user_id_change_xid", "user_id", "change_xid", "change_seq"),
+        Index("ix_collections_status_date", "status", "date"),
+        Index("ix_collections_change_xid", "change_xid"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
-    date = Column(DateTime, nullable=False)
+    date = Column(DateTime, primary_key=True, nullable=False)
     time = Column(String, nullable=False)
+    window_start = Column(Time, nullable=True)  # Janela de horário interpretada a partir de `time`
+    window_end = Column(Time, nullable=True)
+    zone = Column(String, nullable=True)  # Zona e janela contabilizadas em `collection_slots`
+    slot_start = Column(Time, nullable=True)
+    # Janela lotada quando a coleta (criada sem coordenadas) foi geocodificada: não ocupa vaga
+    slot_rejected = Column(Boolean, nullable=False, default=False, server_default="false")
     address = Column(String, nullable=False)
     materials = Column(JSON, nullable=False)  # Store materials as JSON
     status = Column(Enum(CollectionStatus), default=CollectionStatus.pending)
     latitude = Column(Float, nullable=True)  # Allow null values initially
     longitude = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
-    updated_t = Column(DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_t = Column(DateTime(timezone=True), onupdate=func.now())
+    change_seq = Column(BigInteger, change_sequence, server_default=change_sequence.next_value(),
+                        onupdate=change_sequence.next_value(), nullable=False)
+    change_xid = Column(BigInteger, server_default=current_xact_id, onupdate=current_xact_id, nullable=False)
+
+    __mapper_args__ = {"primary_key": [id]}
+
+
+# Partição padrão para tabelas criadas via `create_all`; as mensais são criadas por `python -m app.cli`
+event.listen(
+    Collection.__table__,
+    "after_create",
+    DDL("CREATE TABLE IF NOT EXISTS collections_default PARTITION OF collections DEFAULT").execute_if(dialect="postgresql"),
+)
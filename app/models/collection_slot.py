@@ -0,0 +1,19 @@
+from sqlalchemy import Column, Integer, String, Date, Time, UniqueConstraint
+from app.core.database import Base
+
+
+class CollectionSlot(Base):
+    """Contadores de coletas agendadas por zona, dia e janela de horário."""
+
+    __tablename__ = "collection_slots"
+    __table_args__ = (
+        UniqueConstraint("zone", "date", "slot_start", name="uq_collection_slots_zone_date_slot"),
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    zone = Column(String, nullable=False)
+    date = Column(Date, nullable=False)
+    slot_start = Column(Time, nullable=False)
+    capacity = Column(Integer, nullable=False)  # Inicializada com SLOT_CAPACITY; ajustável por zona
+    pending = Column(Integer, nullable=False, default=0)
+    collected = Column(Integer, nullable=False, default=0)
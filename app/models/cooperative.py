@@ -1,10 +1,13 @@
-from sqlalchemy import Column, Integer, String, DateTime, JSON, Time, Float
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, JSON, Time, Float, Index
 from sqlalchemy.sql import func
-from app.core.database import Base
+from app.core.database import Base, change_sequence, current_xact_id
 
 
 class Cooperative(Base):
     __tablename__ = "cooperative"
+    __table_args__ = (
+        Index("ix_cooperative_change_xid", "change_xid", "change_seq"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
     corporate_name = Column(String, nullable=False)
@@ -17,3 +20,6 @@ class Cooperative(Base):
     latitude = Column(Float, nullable=True)  # Allow null values initially
     longitude = Column(Float, nullable=True)
     created_at = Column(DateTime(timezone=True), server_default=func.now())
+    change_seq = Column(BigInteger, change_sequence, server_default=change_sequence.next_value(),
+                        onupdate=change_sequence.next_value(), nullable=False, index=True)
+    change_xid = Column(BigInteger, server_default=current_xact_id, onupdate=current_xact_id, nullable=False)
@@ -0,0 +1,16 @@
+from sqlalchemy import Column, Integer, String, DateTime, JSON
+from sqlalchemy.sql import func
+from app.core.database import Base
+
+
+class IdempotencyKey(Base):
+    __tablename__ = "idempotency_keys"
+
+    id = Column(Integer, primary_key=True, index=True)
+    key = Column(String, unique=True, index=True, nullable=False)  # "<escopo>:<Idempotency-Key>"
+    request_hash = Column(String, nullable=False)
+    status_code = Column(Integer, nullable=True)  # Nulo enquanto a requisição original está em andamento
+    response = Column(JSON, nullable=True)
+    locked_until = Column(DateTime(timezone=True), nullable=True)  # Prazo da requisição em andamento
+    expires_at = Column(DateTime(timezone=True), nullable=False, index=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
@@ -0,0 +1,30 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Enum, JSON, Text, Index
+from sqlalchemy.sql import func
+from app.core.database import Base
+import enum
+
+class JobStatus(str, enum.Enum):
+    queued = "queued"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+class Job(Base):
+    __tablename__ = "jobs"
+    __table_args__ = (
+        # Usado pela consulta de claim do worker (status + run_at) e pelas métricas por tipo
+        Index("ix_jobs_status_run_at", "status", "run_at"),
+        Index("ix_jobs_type_status", "type", "status"),
+    )
+
+    id = Column(BigInteger, primary_key=True, index=True)
+    type = Column(String, nullable=False)
+    payload = Column(JSON, nullable=False)
+    status = Column(Enum(JobStatus), nullable=False, default=JobStatus.queued)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False)
+    run_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    started_at = Column(DateTime(timezone=True), nullable=True)
+    finished_at = Column(DateTime(timezone=True), nullable=True)
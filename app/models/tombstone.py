@@ -0,0 +1,37 @@
+from sqlalchemy import Column, Integer, BigInteger, String, DateTime, Index, event
+from sqlalchemy.sql import func
+from app.core.database import Base, change_sequence, current_xact_id
+from app.models.collection import Collection
+from app.models.cooperative import Cooperative
+
+
+class Tombstone(Base):
+    """Registro de exclusão, para que clientes sincronizados removam a cópia local."""
+
+    __tablename__ = "tombstones"
+    __table_args__ = (
+        Index("ix_tombstones_entity_owner_id_change_xid", "entity", "owner_id", "change_xid", "change_seq"),
+        Index("ix_tombstones_deleted_at", "deleted_at"),  # Retenção (`purge-expired`)
+    )
+
+    id = Column(Integer, primary_key=True, index=True)
+    entity = Column(String, nullable=False)  # Nome da tabela do registro excluído
+    entity_id = Column(Integer, nullable=False)
+    owner_id = Column(Integer, nullable=True)  # Usuário dono do registro, quando houver
+    change_seq = Column(BigInteger, change_sequence, server_default=change_sequence.next_value(), nullable=False)
+    change_xid = Column(BigInteger, server_default=current_xact_id, nullable=False)
+    deleted_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+def _record_deletion(mapper, connection, target):
+    connection.execute(
+        Tombstone.__table__.insert().values(
+            entity=target.__tablename__,
+            entity_id=target.id,
+            owner_id=getattr(target, "user_id", None),
+        )
+    )
+
+
+for _model in (Collection, Cooperative):
+    event.listen(_model, "after_delete", _record_deletion)
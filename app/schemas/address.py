@@ -0,0 +1,13 @@
+from pydantic import BaseModel
+
+
+class AddressMatchMetrics(BaseModel):
+    addresses: int  # endereços distintos indexados
+    lookups: int
+    exact_matches: int
+    fuzzy_matches: int
+    misses: int
+    match_rate: float
+    duplicates: int  # endereços já geocodificados equivalentes a outro conhecido
+    conflicts: int  # duplicados com coordenadas a mais de ADDRESS_CONFLICT_METERS
+    threshold: float
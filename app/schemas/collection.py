@@ -1,5 +1,5 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime, time
 from typing import List, Dict, Union, Optional
 from app.models.collection import CollectionStatus
 
@@ -27,8 +27,37 @@ class Collection(CollectionBase):
     user_id: int
     created_at: datetime
     updated_t: Union[datetime, None]  # Forma explícita de tratar None
+    window_start: Optional[time] = None  # Janela de horário interpretada a partir de `time`
+    window_end: Optional[time] = None
+    slot_rejected: bool = False  # A janela lotou antes da geocodificação; escolha outro horário
     latitude: Optional[float] = None
     longitude: Optional[float] = None
 
     class Config:
         from_attributes = True  # Compatibilidade com SQLAlchemy
+
+
+class HeatmapCell(BaseModel):
+    lat: float  # Centro da célula
+    lon: float
+    count: int  # Número de coletas
+    kg: Dict[str, float]  # Peso total por material
+
+
+class Heatmap(BaseModel):
+    cell_size: float  # Lado da célula em graus
+    cells: List[HeatmapCell]
+
+
+class Slot(BaseModel):
+    start: time
+    end: time
+    capacity: int
+    booked: int
+    available: int
+
+
+class SlotAvailability(BaseModel):
+    zone: str
+    date: date
+    slots: List[Slot]
@@ -0,0 +1,17 @@
+from pydantic import BaseModel
+from typing import Dict
+
+
+class JobLatency(BaseModel):
+    completed: int
+    wait_avg_seconds: float
+    wait_p95_seconds: float
+    run_avg_seconds: float
+    run_p95_seconds: float
+
+
+class QueueMetrics(BaseModel):
+    depth: Dict[str, Dict[str, int]]  # tipo -> status -> quantidade
+    latency: Dict[str, JobLatency]  # tipo -> latências na janela
+    oldest_ready_age_seconds: float
+    window_minutes: int
@@ -0,0 +1,18 @@
+from pydantic import BaseModel
+from typing import List
+from app.schemas.collection import Collection
+from app.schemas.cooperative import CooperativeOut
+
+
+class DeletedRecord(BaseModel):
+    entity: str  # "collections" ou "cooperative"
+    id: int
+
+
+class SyncResponse(BaseModel):
+    collections: List[Collection]
+    cooperatives: List[CooperativeOut]
+    deleted: List[DeletedRecord]
+    next_token: str  # Enviar como `since` na próxima sincronização
+    has_more: bool  # Se verdadeiro, sincronizar novamente imediatamente com `next_token`
+    reset: bool = False  # Se verdadeiro, descartar a cópia local: a resposta parte do estado completo
@@ -1,15 +1,20 @@
+from typing import Optional
 from pydantic import BaseModel
 
 class Token(BaseModel):
     access_token: str
     token_type: str
+    refresh_token: Optional[str] = None
 
 class TokenPayload(BaseModel):
     sub: int | None = None
+    jti: str | None = None
+    type: str | None = None
+    exp: int | None = None
 
 
 class TokenWithUserDetails(Token):
     type: str
     name: str
     email: str
-    document: str
\ No newline at end of file
+    document: str
@@ -0,0 +1,305 @@
+import math
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, FrozenSet, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import committed_xid_horizon, refresh_periodically
+from app.models.collection import Collection
+from app.models.cooperative import Cooperative
+from app.utils.geocoding import get_lat_long_from_address
+
+# Abreviações comuns em endereços brasileiros, expandidas antes da comparação
+_ABBREVIATIONS = {
+    "r": "rua", "av": "avenida", "avda": "avenida", "al": "alameda", "tv": "travessa",
+    "trav": "travessa", "pc": "praca", "pca": "praca", "rod": "rodovia", "estr": "estrada",
+    "lgo": "largo", "pq": "parque", "jd": "jardim", "jrd": "jardim", "vl": "vila",
+    "s": "sao", "sta": "santa", "sto": "santo", "dr": "doutor", "prof": "professor", "gen": "general",
+    "cel": "coronel", "pres": "presidente", "mal": "marechal", "eng": "engenheiro",
+}
+# Palavras que não distinguem endereços ("nº" vira "no" após a normalização)
+_STOPWORDS = {"de", "da", "do", "das", "dos", "e", "n", "no", "num", "numero", "sn", "cep", "brasil"}
+# Tipos de logradouro (já expandidos), comparados à parte do nome
+_STREET_TYPES = {"rua", "avenida", "alameda", "travessa", "praca", "rodovia", "estrada", "largo", "viela"}
+
+_CEP_RE = re.compile(r"\b\d{5}-?\d{3}\b")
+_NON_ALNUM_RE = re.compile(r"[^a-z0-9]+")
+# Fim do logradouro: o primeiro número ou separador (vírgula, ponto e vírgula, " - ")
+_STREET_END_RE = re.compile(r"\d+|[,;]|\s-\s")
+
+
+class CanonicalAddress(NamedTuple):
+    kind: str  # Tipo do logradouro ("rua", "avenida", ...), ou "" se ausente
+    street: str  # Nome do logradouro, sem o tipo
+    numbers: str  # Números do endereço (imóvel, complemento), em ordem crescente
+    locality: FrozenSet[str]  # Palavras após o logradouro: complemento, bairro, cidade, UF
+
+    def __str__(self) -> str:
+        return " ".join(part for part in (self.kind, self.street, self.numbers, *sorted(self.locality)) if part)
+
+
+def _words(text: str) -> List[str]:
+    return [_ABBREVIATIONS.get(token, token) for token in _NON_ALNUM_RE.split(text)
+            if token and not token.isdigit() and token not in _STOPWORDS]
+
+
+def canonicalize(address: str) -> CanonicalAddress:
+    """
+    Normaliza um endereço para comparação, separando tipo e nome do logradouro, números e localidade.
+
+    Remove acentos, pontuação, CEP e palavras sem valor distintivo e expande abreviações
+    ("R." → "rua", "Av." → "avenida"). O logradouro é o texto até o primeiro número ou separador;
+    o que vem depois (bairro, cidade) forma a localidade. Dois endereços só são considerados
+    equivalentes se os números forem iguais e as localidades compatíveis (ver `_compatible`).
+    """
+    normalized = unicodedata.normalize("NFKD", address).encode("ascii", "ignore").decode().lower()
+    normalized = _CEP_RE.sub(" ", normalized.replace("s/n", " "))
+    end = _STREET_END_RE.search(normalized)
+    split = end.start() if end else len(normalized)
+    street = _words(normalized[:split])
+    kind = street.pop(0) if street and street[0] in _STREET_TYPES else ""
+    numbers = sorted({str(int(token)) for token in _NON_ALNUM_RE.split(normalized) if token.isdigit()}, key=int)
+    return CanonicalAddress(kind, " ".join(street), " ".join(numbers), frozenset(_words(normalized[split:])))
+
+
+def _compatible(a: CanonicalAddress, b: CanonicalAddress) -> bool:
+    # Tipos diferentes ("rua" x "avenida") ou localidades divergentes ("centro" x "bela vista")
+    # indicam lugares diferentes; a ausência de um deles (endereço incompleto) não
+    if a.kind and b.kind and a.kind != b.kind:
+        return False
+    return a.locality <= b.locality or b.locality <= a.locality
+
+
+def trigrams(name: str) -> List[str]:
+    """Trigramas de cada palavra, com o mesmo preenchimento do `pg_trgm` ("  p", " pa", ..., "ra ")."""
+    grams = set()
+    for word in name.split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return list(grams)
+
+
+def _distance_meters(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    # Aproximação equiretangular, suficiente para distâncias de poucos quilômetros
+    x = math.radians(lon2 - lon1) * math.cos(math.radians((lat1 + lat2) / 2))
+    y = math.radians(lat2 - lat1)
+    return 6_371_000 * math.hypot(x, y)
+
+
+class AddressMatch(NamedTuple):
+    address: str  # Endereço conhecido (canônico) que correspondeu
+    latitude: float
+    longitude: float
+    similarity: float
+
+
+class _IndexState:
+    """Conteúdo do índice; substituído por inteiro a cada reconstrução."""
+
+    def __init__(self):
+        # Entradas: (endereço canônico, latitude, longitude, quantidade de trigramas do nome)
+        self.entries: List[Tuple[CanonicalAddress, float, float, int]] = []
+        # (nome do logradouro, números) -> entradas, que podem diferir no tipo e na localidade
+        self.exact: Dict[Tuple[str, str], List[int]] = {}
+        # Números do endereço -> trigrama do nome do logradouro -> entradas que o contêm
+        self.blocks: Dict[str, Dict[str, List[int]]] = {}
+        self.watermark = 0  # Horizonte de transações (`change_xid`) já carregado
+        self.duplicates = 0
+        self.conflicts = 0
+
+
+class AddressIndex:
+    """
+    Índice em memória de endereços já geocodificados, para reaproveitar coordenadas.
+
+    Cada endereço é normalizado por `canonicalize` e indexado pelos trigramas do nome do
+    logradouro, num índice invertido particionado pelos números do endereço: um endereço só é
+    comparado com os que têm os mesmos números, o que limita cada consulta a poucas dezenas de
+    candidatos mesmo com centenas de milhares de endereços. A similaridade é a mesma do `pg_trgm`
+    (trigramas em comum sobre a união), calculada apenas sobre o nome do logradouro, e uma
+    correspondência exige ao menos `threshold` e tipo e localidade compatíveis: bairro e cidade
+    em comum não aproximam ruas diferentes.
+
+    Os endereços vêm das coletas e cooperativas com coordenadas e das geocodificações feitas por
+    este processo. Uma thread iniciada por `start` busca a cada `refresh_seconds` as linhas
+    gravadas por transações já encerradas (`change_xid`, como em `CollectionSnapshot`) e, a cada
+    `rebuild_seconds`, reconstrói o índice e o substitui de uma vez, refletindo exclusões e
+    correções. As consultas apenas leem o estado atual, sem acessar o banco nem aguardar a
+    carga. Endereços equivalentes com coordenadas distantes são contados como conflitos, sinal
+    de geocodificação de baixa qualidade.
+    """
+
+    def __init__(self, threshold: float, conflict_meters: float, refresh_seconds: float,
+                 rebuild_seconds: float):
+        self.threshold = threshold
+        self.conflict_meters = conflict_meters
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._state = _IndexState()
+        self._lock = threading.Lock()
+        self._built_at: Optional[float] = None  # Nunca construído
+        self._thread: Optional[threading.Thread] = None
+        self.lookups = 0
+        self.exact_matches = 0
+        self.fuzzy_matches = 0
+
+    def __len__(self) -> int:
+        return len(self._state.entries)
+
+    def _find_exact(self, state: _IndexState, address: CanonicalAddress) -> Optional[int]:
+        for entry in state.exact.get((address.street, address.numbers), ()):
+            if _compatible(address, state.entries[entry][0]):
+                return entry
+        return None
+
+    def _search(self, state: _IndexState, address: CanonicalAddress,
+                grams: List[str]) -> Optional[Tuple[int, float]]:
+        block = state.blocks.get(address.numbers)
+        if not block or not grams:
+            return None
+        counts: Dict[int, int] = {}
+        for gram in grams:
+            for entry in block.get(gram, ()):
+                counts[entry] = counts.get(entry, 0) + 1
+
+        n = len(grams)
+        # Uma similaridade mínima `t` exige ao menos `t * n` trigramas em comum
+        min_common = self.threshold * n
+        best, best_similarity = None, 0.0
+        for entry, common in counts.items():
+            if common < min_common:
+                continue
+            known, _, _, known_grams = state.entries[entry]
+            similarity = common / (n + known_grams - common)
+            if similarity > best_similarity and _compatible(address, known):
+                best, best_similarity = entry, similarity
+        if best is None or best_similarity < self.threshold:
+            return None
+        return best, best_similarity
+
+    def lookup(self, address: str) -> Optional[AddressMatch]:
+        """Endereço conhecido equivalente a `address`, ou `None`."""
+        state = self._state
+        canonical = canonicalize(address)
+        self.lookups += 1
+
+        entry = self._find_exact(state, canonical)
+        if entry is not None:
+            self.exact_matches += 1
+            similarity = 1.0
+        else:
+            found = self._search(state, canonical, trigrams(canonical.street))
+            if found is None:
+                return None
+            entry, similarity = found
+            self.fuzzy_matches += 1
+
+        known, lat, lon, _ = state.entries[entry]
+        return AddressMatch(str(known), lat, lon, similarity)
+
+    def _insert(self, state: _IndexState, address: str, lat: float, lon: float) -> None:
+        canonical = canonicalize(address)
+        grams = trigrams(canonical.street)
+        entry = self._find_exact(state, canonical)
+        if entry is None:
+            found = self._search(state, canonical, grams)
+            entry = found[0] if found is not None else None
+        if entry is not None:
+            state.duplicates += 1
+            known, known_lat, known_lon, _ = state.entries[entry]
+            if _distance_meters(lat, lon, known_lat, known_lon) > self.conflict_meters:
+                state.conflicts += 1
+            if known == canonical:
+                return
+
+        entry = len(state.entries)
+        state.entries.append((canonical, lat, lon, len(grams)))
+        state.exact.setdefault((canonical.street, canonical.numbers), []).append(entry)
+        block = state.blocks.setdefault(canonical.numbers, {})
+        for gram in grams:
+            block.setdefault(gram, []).append(entry)
+
+    def add(self, address: str, lat: float, lon: float) -> None:
+        with self._lock:
+            self._insert(self._state, address, lat, lon)
+
+    def refresh(self, db: Session) -> None:
+        """Carrega os endereços novos ou, a cada `rebuild_seconds`, reconstrói o índice."""
+        now = time.monotonic()
+        rebuild = self._built_at is None or now - self._built_at >= self.rebuild_seconds
+        state = _IndexState() if rebuild else self._state
+        horizon = committed_xid_horizon(db)
+        rows = []
+        for model in (Cooperative, Collection):
+            rows.extend(db.query(model.address, model.latitude, model.longitude).filter(
+                model.change_xid >= state.watermark,
+                model.change_xid < horizon,
+                model.latitude.isnot(None)
+            ).yield_per(10_000))
+
+        if rebuild:
+            # O novo estado é montado fora da trava; as consultas seguem usando o anterior
+            for row in rows:
+                self._insert(state, row.address, row.latitude, row.longitude)
+            state.watermark = horizon
+            with self._lock:
+                self._state = state
+            self._built_at = now
+        else:
+            with self._lock:
+                for row in rows:
+                    self._insert(state, row.address, row.latitude, row.longitude)
+                state.watermark = horizon
+
+    def start(self) -> None:
+        """Inicia a thread que mantém o índice atualizado (uma por processo)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = refresh_periodically("address-index", self.refresh, self.refresh_seconds)
+
+    def metrics(self) -> dict:
+        state = self._state
+        matches = self.exact_matches + self.fuzzy_matches
+        return {
+            "addresses": len(state.entries),
+            "lookups": self.lookups,
+            "exact_matches": self.exact_matches,
+            "fuzzy_matches": self.fuzzy_matches,
+            "misses": self.lookups - matches,
+            "match_rate": matches / self.lookups if self.lookups else 0.0,
+            "duplicates": state.duplicates,
+            "conflicts": state.conflicts,
+            "threshold": self.threshold,
+        }
+
+
+address_index = AddressIndex(
+    threshold=settings.ADDRESS_MATCH_THRESHOLD,
+    conflict_meters=settings.ADDRESS_CONFLICT_METERS,
+    refresh_seconds=settings.ADDRESS_INDEX_REFRESH_SECONDS,
+    rebuild_seconds=settings.ADDRESS_INDEX_REBUILD_SECONDS,
+)
+
+
+def geocode(address: str, use_geocoder: bool = True) -> Optional[Tuple[float, float]]:
+    """
+    Coordenadas de `address`, reaproveitando as de um endereço conhecido equivalente.
+
+    Só chama o geocodificador externo (Nominatim) quando não há correspondência no índice e
+    `use_geocoder` é verdadeiro; o resultado é então acrescentado ao índice. O índice é mantido
+    pela thread de `address_index.start`; antes da primeira carga, todas as consultas são perdas.
+    """
+    if settings.ADDRESS_MATCH_ENABLED:
+        match = address_index.lookup(address)
+        if match is not None:
+            return match.latitude, match.longitude
+    if not use_geocoder:
+        return None
+    lat_long = get_lat_long_from_address(address)
+    if lat_long is not None and settings.ADDRESS_MATCH_ENABLED:
+        address_index.add(address, *lat_long)
+    return lat_long
@@ -1,16 +1,26 @@
-import requests
 import logging
 from typing import Optional, Tuple
 
+from app.core.config import settings
+from app.core.rate_limit import TokenBucket
+
 logger = logging.getLogger(__name__)
 
+# Compartilhado por todas as chamadas (e entre processos, se o rate limiting usar Redis)
+_nominatim_limit = TokenBucket("geocoder", capacity=1, period=1 / settings.GEOCODER_RATE_PER_SECOND)
+
 def get_lat_long_from_address(address: str) -> Optional[Tuple[float, float]]:
     """
     Obtém a latitude e longitude a partir de um endereço usando a API Nominatim.
 
+    As chamadas respeitam `GEOCODER_RATE_PER_SECOND`; se o limite não liberar a chamada em até
+    `GEOCODER_MAX_WAIT_SECONDS`, o endereço não é geocodificado.
+
     :param address: Endereço a ser geocodificado.
     :return: Tupla (latitude, longitude) ou None se falhar.
     """
+    import requests  # Importado sob demanda: só é necessário ao criar coletas/cooperativas
+
     url = "https://nominatim.openstreetmap.org/search"
     params = {
         "q": address,
@@ -20,6 +30,9 @@ def get_lat_long_from_address(address: str) -> Optional[Tuple[float, float]]:
     headers = {
         "User-Agent": "MyApp (ecolink@example.com)"
     }
+    if not _nominatim_limit.acquire("nominatim", settings.GEOCODER_MAX_WAIT_SECONDS):
+        logger.warning(f"Limite de requisições ao geocodificador atingido; endereço '{address}' não geocodificado.")
+        return None
     try:
         response = requests.get(url, params=params, headers=headers, timeout=10)
         response.raise_for_status()
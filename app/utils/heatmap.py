@@ -0,0 +1,231 @@
+import math
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from app.core.config import settings
+from app.core.database import committed_xid_horizon, refresh_periodically
+from app.models.collection import Collection
+
+# Fatores de conversão de `unity` para kg; unidades desconhecidas não somam peso
+_UNIT_TO_KG = {"kg": 1.0, "g": 0.001, "t": 1000.0, "ton": 1000.0}
+
+# Células por lado de um tile do mapa no nível de zoom solicitado
+_CELLS_PER_TILE = 8
+
+
+def _material_items(materials) -> Iterable[Tuple[str, float]]:
+    for item in materials or []:
+        name = str(item.get("material", "")).strip().lower()
+        if not name:
+            continue
+        try:
+            quantity = float(item.get("quantity", 0))
+        except (TypeError, ValueError):
+            quantity = 0.0
+        factor = _UNIT_TO_KG.get(str(item.get("unity", "kg")).strip().lower(), 0.0)
+        yield name, quantity * factor
+
+
+class _SnapshotState:
+    """Conteúdo do snapshot; substituído por inteiro a cada reconstrução."""
+
+    def __init__(self):
+        self.ids = set()
+        self.materials: Dict[str, int] = {}
+        self.points = None
+        self.items = None
+        self.pending_points: List[Tuple[float, float]] = []
+        self.pending_items: List[Tuple[float, float, int, float, int]] = []
+        self.watermark = 0  # Horizonte de transações (`change_xid`) já carregado
+
+    def append(self, id: int, lat: Optional[float], lon: Optional[float], materials) -> None:
+        if id in self.ids or lat is None or lon is None:
+            return
+        self.ids.add(id)
+        point = len(self.ids) - 1
+        self.pending_points.append((lat, lon))
+        for name, kg in _material_items(materials):
+            code = self.materials.setdefault(name, len(self.materials))
+            self.pending_items.append((lat, lon, code, kg, point))
+
+    def consolidate(self) -> None:
+        import numpy as np
+
+        if self.pending_points:
+            new = np.array(self.pending_points, dtype=np.float64).reshape(-1, 2)
+            self.points = new if self.points is None else np.concatenate([self.points, new])
+            self.pending_points = []
+        if self.pending_items:
+            new = np.array(self.pending_items, dtype=np.float64).reshape(-1, 5)
+            self.items = new if self.items is None else np.concatenate([self.items, new])
+            self.pending_items = []
+
+
+class CollectionSnapshot:
+    """
+    Cópia colunar (arrays NumPy) das coordenadas e materiais das coletas, usada para agregar
+    o mapa de calor sem ler a tabela `collections` a cada requisição.
+
+    São mantidos dois conjuntos de colunas: um por coleta (lat, lon), para contagens, e outro
+    por item de material (lat, lon, material, kg, índice da coleta), para pesos e para contar
+    coletas por material. Novas coletas são acrescentadas incrementalmente: localmente via `add`
+    e, para as criadas por outros processos, por uma thread iniciada por `start`, que busca a cada
+    `refresh_seconds` as linhas gravadas por transações já encerradas desde a última busca
+    (`change_xid` entre o horizonte anterior e o atual; ver `committed_xid_horizon`). A cada
+    `rebuild_seconds` a thread reconstrói o snapshot fora da trava e o substitui de uma vez,
+    refletindo exclusões e correções; `add` e as requisições do mapa nunca aguardam a leitura
+    do banco.
+    """
+
+    def __init__(self, refresh_seconds: float, rebuild_seconds: float):
+        self.refresh_seconds = refresh_seconds
+        self.rebuild_seconds = rebuild_seconds
+        self._state = _SnapshotState()
+        self._lock = threading.Lock()
+        self._built_at: Optional[float] = None  # Nunca construído
+        # Coletas adicionadas durante uma reconstrução, reaplicadas ao novo estado
+        self._replay: Optional[List[tuple]] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, collection: Collection) -> None:
+        # O horizonte não avança aqui: coletas de outros processos com transações anteriores
+        # ainda podem não ter sido buscadas; quando forem, `append` ignora os ids já vistos
+        self._append(collection.id, collection.latitude, collection.longitude, collection.materials)
+
+    def _append(self, id: int, lat: Optional[float], lon: Optional[float], materials) -> None:
+        with self._lock:
+            self._state.append(id, lat, lon, materials)
+            if self._replay is not None:
+                self._replay.append((id, lat, lon, materials))
+
+    def _changed(self, db: Session, watermark: int, horizon: int):
+        return db.query(
+            Collection.id, Collection.latitude, Collection.longitude, Collection.materials
+        ).filter(
+            Collection.change_xid >= watermark,
+            Collection.change_xid < horizon,
+            Collection.latitude.isnot(None)
+        ).yield_per(10_000)
+
+    def refresh(self, db: Session) -> None:
+        """Busca as coletas novas ou, a cada `rebuild_seconds`, reconstrói o snapshot."""
+        now = time.monotonic()
+        horizon = committed_xid_horizon(db)
+        if self._built_at is not None and now - self._built_at < self.rebuild_seconds:
+            state = self._state
+            rows = list(self._changed(db, state.watermark, horizon))
+            with self._lock:
+                for row in rows:
+                    state.append(row.id, row.latitude, row.longitude, row.materials)
+                state.watermark = horizon
+            return
+
+        with self._lock:
+            self._replay = []
+        try:
+            state = _SnapshotState()
+            for row in self._changed(db, 0, horizon):
+                state.append(row.id, row.latitude, row.longitude, row.materials)
+            state.watermark = horizon
+            state.consolidate()
+            with self._lock:
+                for args in self._replay:
+                    state.append(*args)
+                self._state = state
+        finally:
+            with self._lock:
+                self._replay = None
+        self._built_at = now
+
+    def start(self) -> None:
+        """Inicia a thread que mantém o snapshot atualizado (uma por processo)."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = refresh_periodically("heatmap-snapshot", self.refresh, self.refresh_seconds)
+
+    def arrays(self):
+        """Consolida as linhas pendentes e devolve `(points, items, materials)`."""
+        import numpy as np
+
+        with self._lock:
+            state = self._state
+            state.consolidate()
+            points = state.points if state.points is not None else np.empty((0, 2))
+            items = state.items if state.items is not None else np.empty((0, 5))
+            return points, items, dict(state.materials)
+
+
+def cell_size_for(zoom: int, bbox: Tuple[float, float, float, float], max_cells: int) -> float:
+    """Tamanho da célula (em graus) para o zoom, ampliado até o bbox caber em `max_cells`."""
+    min_lon, min_lat, max_lon, max_lat = bbox
+    size = 360.0 / (2 ** zoom) / _CELLS_PER_TILE
+    while math.ceil((max_lon - min_lon) / size) * math.ceil((max_lat - min_lat) / size) > max_cells:
+        size *= 2
+    return size
+
+
+def aggregate(points, items, materials: Dict[str, int], bbox: Tuple[float, float, float, float],
+              cell_size: float, material: Optional[str] = None) -> List[dict]:
+    """
+    Agrega pontos em células de uma grade global de `cell_size` graus dentro do `bbox`.
+
+    A grade é ancorada em (0, 0), portanto as células são as mesmas ao deslocar o mapa. O custo
+    é linear no número de pontos do snapshot (operações vetorizadas) e o resultado é limitado
+    pelo número de células.
+    """
+    import numpy as np
+
+    min_lon, min_lat, max_lon, max_lat = bbox
+    code = None
+    if material is not None:
+        code = materials.get(material.strip().lower())
+        if code is None:
+            return []
+        mask = items[:, 2] == code
+        items = items[mask]
+        # Cada coleta conta uma vez, mesmo com vários itens do mesmo material
+        points = points[np.unique(items[:, 4].astype(np.int64))]
+
+    def cell_keys(lat, lon):
+        inside = (lat >= min_lat) & (lat <= max_lat) & (lon >= min_lon) & (lon <= max_lon)
+        ix = np.floor(lon[inside] / cell_size).astype(np.int64)
+        iy = np.floor(lat[inside] / cell_size).astype(np.int64)
+        # Índices cabem em 32 bits para qualquer tamanho de célula usado pela API
+        return inside, (ix << 32) | (iy & 0xFFFFFFFF)
+
+    _, point_keys = cell_keys(points[:, 0], points[:, 1])
+    if point_keys.size == 0:
+        return []
+    cells, counts = np.unique(point_keys, return_counts=True)
+
+    item_inside, item_keys = cell_keys(items[:, 0], items[:, 1])
+    names = {code: name for name, code in materials.items()}
+    n_materials = max(len(materials), 1)
+    kg_by_cell = np.zeros((cells.size, n_materials))
+    if item_keys.size:
+        cell_idx = np.searchsorted(cells, item_keys)
+        mat_idx = items[item_inside, 2].astype(np.int64)
+        np.add.at(kg_by_cell, (cell_idx, mat_idx), items[item_inside, 3])
+
+    result = []
+    for i, key in enumerate(cells.tolist()):
+        ix, iy = key >> 32, key & 0xFFFFFFFF
+        if iy >= 0x80000000:
+            iy -= 0x100000000
+        nonzero = np.nonzero(kg_by_cell[i])[0]
+        result.append({
+            "lat": (iy + 0.5) * cell_size,
+            "lon": (ix + 0.5) * cell_size,
+            "count": int(counts[i]),
+            "kg": {names[m]: round(float(kg_by_cell[i, m]), 3) for m in nonzero.tolist()},
+        })
+    return result
+
+
+collection_snapshot = CollectionSnapshot(
+    refresh_seconds=settings.HEATMAP_REFRESH_SECONDS,
+    rebuild_seconds=settings.HEATMAP_REBUILD_SECONDS,
+)
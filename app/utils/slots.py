@@ -0,0 +1,82 @@
+import math
+import re
+import unicodedata
+from datetime import time
+from typing import List, Tuple
+
+from app.core.config import settings
+
+# Períodos aceitos no campo `time` além de horários explícitos
+_PERIODS = {
+    "manha": (time(8, 0), time(12, 0)),
+    "tarde": (time(12, 0), time(18, 0)),
+    "noite": (time(18, 0), time(22, 0)),
+}
+
+_TIME_RE = re.compile(r"(\d{1,2})\s*(?:[:h]\s*(\d{2}))?")
+
+
+def _minutes(t: time) -> int:
+    return t.hour * 60 + t.minute
+
+
+def _from_minutes(minutes: int) -> time:
+    minutes = min(minutes, 24 * 60 - 1)
+    return time(minutes // 60, minutes % 60)
+
+
+def parse_time_window(value: str) -> Tuple[time, time]:
+    """
+    Interpreta o campo livre `time` de uma coleta como uma janela de horário.
+
+    Aceita um horário ("10:00", "10h", "10h30"), um intervalo ("10:00-12:00", "10h às 12h")
+    ou um período ("manhã", "tarde", "noite"). Um horário isolado corresponde à janela de
+    `SLOT_MINUTES` que o contém.
+
+    :raises ValueError: Se o valor não puder ser interpretado.
+    """
+    normalized = unicodedata.normalize("NFKD", value).encode("ascii", "ignore").decode().strip().lower()
+    if normalized in _PERIODS:
+        return _PERIODS[normalized]
+
+    matches = _TIME_RE.findall(normalized)
+    if not matches or len(matches) > 2:
+        raise ValueError(f"Invalid time: {value!r}")
+    times = []
+    for hour, minute in matches:
+        hour, minute = int(hour), int(minute or 0)
+        if hour > 23 or minute > 59:
+            raise ValueError(f"Invalid time: {value!r}")
+        times.append(time(hour, minute))
+
+    if len(times) == 2:
+        if times[1] <= times[0]:
+            raise ValueError(f"Invalid time window: {value!r}")
+        return times[0], times[1]
+    start = slot_for(times[0])
+    return start, _from_minutes(_minutes(start) + settings.SLOT_MINUTES)
+
+
+def slot_for(t: time) -> time:
+    """Início da janela de `SLOT_MINUTES` que contém o horário."""
+    minutes = _minutes(t)
+    return _from_minutes(minutes - minutes % settings.SLOT_MINUTES)
+
+
+def window_slots(start: time, end: time) -> List[time]:
+    """Inícios das janelas de `SLOT_MINUTES` que se sobrepõem ao intervalo `[start, end)`."""
+    first, last = _minutes(slot_for(start)), _minutes(end)
+    return [_from_minutes(m) for m in range(first, max(last, first + 1), settings.SLOT_MINUTES)]
+
+
+def day_slots() -> List[time]:
+    return [
+        _from_minutes(m)
+        for m in range(settings.SLOT_DAY_START * 60, settings.SLOT_DAY_END * 60, settings.SLOT_MINUTES)
+    ]
+
+
+def zone_for(lat: float, lon: float) -> str:
+    """Identificador da célula de `ZONE_CELL_DEGREES` graus que contém a coordenada."""
+    size = settings.ZONE_CELL_DEGREES
+    return f"{math.floor(lat / size)}:{math.floor(lon / size)}"
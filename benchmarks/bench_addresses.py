@@ -0,0 +1,123 @@
+"""
+Mede a taxa de correspondência e o custo por consulta do índice de endereços.
+
+Indexa `--addresses` endereços sintéticos já geocodificados e consulta grafias alternativas
+de endereços conhecidos (abreviações, acentos, CEP, "nº", caixa), grafias com um erro de
+digitação, endereços desconhecidos (mesma rua, outro número) e falsos positivos em potencial
+(outra rua, mesmo número e bairro). Para cada grupo, informa a taxa de correspondência, as
+correspondências com coordenadas erradas e o tempo por consulta. Os `duplicates` da construção
+do índice são endereços únicos tomados por outro já indexado (idealmente zero).
+
+Uso:
+    python -m benchmarks.bench_addresses [--addresses 100000] [--queries 5000] [--threshold 0.6]
+"""
+import argparse
+import random
+import statistics
+import time
+
+from app.utils.addresses import AddressIndex
+
+TYPES = [("Rua", "R."), ("Avenida", "Av."), ("Travessa", "Tv."), ("Alameda", "Al."), ("Praça", "Pça.")]
+TITLES = ["", "", "", "Doutor ", "Professor ", "Coronel ", "Santa ", "São "]
+SYLLABLES = ["ba", "ca", "da", "fe", "go", "ja", "li", "ma", "no", "pa", "ra", "sa", "ta", "vi", "zé",
+             "lu", "ro", "mi", "ne", "que", "gui", "ção", "lã", "tô"]
+NEIGHBORHOODS = ["Centro", "Bela Vista", "Vila Mariana", "Jardim Paulista", "Mooca", "Pinheiros", "Lapa"]
+
+
+def _name(rng: random.Random) -> str:
+    return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).capitalize()
+
+
+def generate(n: int, rng: random.Random):
+    """Endereços únicos `(tipo, nome da rua, número, bairro, lat, lon)`."""
+    streets = [(rng.choice(TYPES), rng.choice(TITLES) + _name(rng) + " " + _name(rng))
+               for _ in range(max(n // 20, 1))]
+    seen, addresses = set(), []
+    while len(addresses) < n:
+        street = rng.randrange(len(streets))
+        number = rng.randint(1, 3000)
+        if (street, number) in seen:
+            continue
+        seen.add((street, number))
+        kind, name = streets[street]
+        lat = -23.5 - street % 200 / 1000 - number / 1e6
+        lon = -46.6 - street // 200 / 1000
+        addresses.append((kind, name, number, rng.choice(NEIGHBORHOODS), lat, lon))
+    return addresses
+
+
+def variant(address, rng: random.Random) -> str:
+    (full, short), name, number, neighborhood, _, _ = address
+    kind = rng.choice([full, short, short.upper(), full.lower()])
+    if rng.random() < 0.5:
+        name = name.replace("São", "S.").replace("Doutor", "Dr.").replace("Professor", "Prof.")
+    separator = rng.choice([", ", " ", ", nº ", " n. "])
+    suffix = rng.choice(["", "", f" - {neighborhood}", f", CEP 0{rng.randint(1000, 9999)}-{rng.randint(100, 999)}"])
+    text = f"{kind} {name}{separator}{number}{suffix}"
+    return text if rng.random() < 0.5 else text.lower()
+
+
+def typo(address, rng: random.Random) -> str:
+    (full, _), name, number, _, _, _ = address
+    chars = list(name)
+    i = rng.randrange(1, len(chars) - 1)
+    chars[i], chars[i + 1] = chars[i + 1], chars[i]
+    return f"{full} {''.join(chars)}, {number}"
+
+
+def run(index: AddressIndex, queries, label: str) -> None:
+    matched = wrong = 0
+    timings = []
+    for text, expected in queries:
+        start = time.perf_counter()
+        match = index.lookup(text)
+        timings.append(time.perf_counter() - start)
+        if match is not None:
+            matched += 1
+            if expected is None or (match.latitude, match.longitude) != expected:
+                wrong += 1
+    timings.sort()
+    print(f"{label:<24}{matched / len(queries):>10.1%}{wrong:>10}"
+          f"{statistics.mean(timings) * 1e6:>12.1f}{timings[int(len(timings) * 0.99)] * 1e6:>12.1f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--addresses", type=int, default=100_000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--threshold", type=float, default=0.6)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    addresses = generate(args.addresses, rng)
+    index = AddressIndex(args.threshold, conflict_meters=250, refresh_seconds=0, rebuild_seconds=0)
+    start = time.perf_counter()
+    for kind_names, name, number, neighborhood, lat, lon in addresses:
+        index.add(f"{kind_names[0]} {name}, {number} - {neighborhood}", lat, lon)
+    build = time.perf_counter() - start
+    print(f"{len(index)} endereços indexados em {build:.2f} s (similaridade mínima {args.threshold})")
+
+    sample = rng.sample(addresses, args.queries)
+    known = {(a[1], a[2]) for a in addresses}
+    unknown = []
+    for a in sample:
+        number = rng.randint(3001, 9999)
+        if (a[1], number) not in known:
+            unknown.append((f"{a[0][0]} {a[1]}, {number}", None))
+    other_street = []
+    for a in sample:
+        b = rng.choice(addresses)
+        if b[1] != a[1] and (b[1], a[2]) not in known:
+            other_street.append((f"{b[0][0]} {b[1]}, {a[2]} - {a[3]}", None))
+
+    print(f"\n{'consultas':<24}{'corresp.':>10}{'erradas':>10}{'média (us)':>12}{'p99 (us)':>12}")
+    run(index, [(variant(a, rng), (a[4], a[5])) for a in sample], "grafias alternativas")
+    run(index, [(typo(a, rng), (a[4], a[5])) for a in sample], "erro de digitação")
+    run(index, unknown, "endereços desconhecidos")
+    run(index, other_street, "outra rua, mesmo número")
+    print(f"\n{index.metrics()}")
+
+
+if __name__ == "__main__":
+    main()
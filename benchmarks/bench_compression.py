@@ -0,0 +1,89 @@
+"""
+Mede bytes trafegados e CPU por requisição da compressão de respostas.
+
+Gera uma página típica de `GET /cooperatives/` e de `GET /collections/user` (registros
+repetitivos com endereços e listas de materiais) e compara, para cada codificação, o tamanho
+do corpo e o tempo de CPU da compressão por requisição, contra o custo de servir a variante
+já comprimida do `ResponseCache`.
+
+Uso:
+    python -m benchmarks.bench_compression [--records 100] [--repeat 200]
+"""
+import argparse
+import json
+import random
+import time
+
+from app.core.compression import CompressedBody, _brotli, compress
+
+STREETS = ["Rua das Flores", "Avenida Paulista", "Rua Augusta", "Rua da Consolação", "Avenida Brasil"]
+MATERIALS = ["papel", "plástico", "vidro", "metal", "eletrônicos"]
+
+
+def cooperatives_page(n: int) -> bytes:
+    rng = random.Random(1)
+    return json.dumps([{
+        "id": i,
+        "corporate_name": f"Cooperativa de Reciclagem {i}",
+        "address": f"{rng.choice(STREETS)}, {rng.randint(1, 2000)} - São Paulo, SP",
+        "cnpj": f"{rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}/0001-{rng.randint(10, 99)}",
+        "materials": rng.sample(MATERIALS, 3),
+        "phone": f"(11) 9{rng.randint(1000, 9999)}-{rng.randint(1000, 9999)}",
+        "open_time": "08:00:00",
+        "close_time": "18:00:00",
+        "latitude": -23.5 - rng.random() / 10,
+        "longitude": -46.6 - rng.random() / 10,
+        "created_at": "2024-11-26T10:00:00Z",
+    } for i in range(n)]).encode()
+
+
+def collections_page(n: int) -> bytes:
+    rng = random.Random(2)
+    return json.dumps([{
+        "id": i,
+        "user_id": 1,
+        "date": "2024-11-26T00:00:00",
+        "time": "10:00-12:00",
+        "address": f"{rng.choice(STREETS)}, {rng.randint(1, 2000)}",
+        "materials": [{"material": m, "quantity": rng.randint(1, 50), "unity": "KG"}
+                      for m in rng.sample(MATERIALS, 2)],
+        "status": "pending",
+        "latitude": -23.5 - rng.random() / 10,
+        "longitude": -46.6 - rng.random() / 10,
+        "created_at": "2024-11-26T10:00:00Z",
+        "updated_t": None,
+    } for i in range(n)]).encode()
+
+
+def bench(name: str, body: bytes, repeat: int) -> None:
+    encodings = ["gzip", "br"] if _brotli() is not None else ["gzip"]
+    print(f"\n{name}: {len(body)} bytes sem compressão")
+    print(f"{'codificação':<12}{'bytes':>10}{'razão':>8}{'CPU/req (us)':>15}{'cache hit (us)':>16}")
+    for encoding in encodings:
+        start = time.process_time()
+        for _ in range(repeat):
+            compressed = compress(body, encoding)
+        cpu = (time.process_time() - start) / repeat
+
+        cached = CompressedBody(body)
+        cached.get(encoding)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            cached.get(encoding)
+        hit = (time.perf_counter() - start) / repeat
+
+        print(f"{encoding:<12}{len(compressed):>10}{len(body) / len(compressed):>8.1f}"
+              f"{cpu * 1e6:>15.1f}{hit * 1e6:>16.2f}")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--records", type=int, default=100)
+    parser.add_argument("--repeat", type=int, default=200)
+    args = parser.parse_args()
+    bench("GET /cooperatives/", cooperatives_page(args.records), args.repeat)
+    bench("GET /collections/user", collections_page(args.records), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
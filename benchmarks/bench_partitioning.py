@@ -0,0 +1,106 @@
+"""
+Mede o efeito do particionamento mensal de `collections` nas consultas de coletas recentes.
+
+Popula a tabela com `--rows` coletas distribuídas uniformemente pelos últimos `--months` meses
+(via `generate_series`, no próprio PostgreSQL) e executa `EXPLAIN (ANALYZE, FORMAT JSON)` da
+consulta de coletas pendentes do mês corrente, informando quantas partições foram acessadas e
+o tempo de planejamento e execução. Requer um banco migrado para a tabela particionada
+(ver app/core/partitioning.py); use um banco descartável, pois o seed insere milhões de linhas.
+
+Uso:
+    python -m benchmarks.bench_partitioning [--rows 2000000] [--months 24] [--repeat 5] [--skip-seed]
+"""
+import argparse
+import json
+import statistics
+from datetime import date
+
+from sqlalchemy import text
+
+from app.core import partitioning
+from app.core.database import engine
+
+BENCH_EMAIL = "bench-partitioning@example.com"
+
+HOT_QUERY = (
+    "SELECT * FROM collections "
+    "WHERE status = 'pending' AND date >= :start AND date < :end "
+    "ORDER BY date LIMIT 100"
+)
+
+
+def seed(rows: int, months: int) -> None:
+    today = date.today()
+    first = partitioning.add_months(partitioning.month_start(today), -(months - 1))
+    end = partitioning.add_months(today, 1)
+    with engine.begin() as conn:
+        partitioning.ensure_partitions(conn, first, today)
+        user_id = conn.execute(text("SELECT id FROM users WHERE email = :email"), {"email": BENCH_EMAIL}).scalar()
+        if user_id is None:
+            user_id = conn.execute(text(
+                "INSERT INTO users (email, hashed_password, name, type, address, phone, document) "
+                "VALUES (:email, '-', 'Benchmark', 'residential', '-', '-', '-') RETURNING id"
+            ), {"email": BENCH_EMAIL}).scalar()
+        # Apenas ~2% das coletas antigas continuam pendentes, como em produção
+        conn.execute(text(
+            "INSERT INTO collections (user_id, date, time, address, materials, status) "
+            "SELECT :user_id, "
+            "       CAST(:first AS timestamp) + (random() * (CAST(:end AS timestamp) - CAST(:first AS timestamp))), "
+            "       '10:00-12:00', 'Rua das Flores, ' || g, "
+            "       '[{\"material\": \"papel\", \"quantity\": 1, \"unity\": \"KG\"}]', "
+            "       CASE WHEN random() < 0.02 THEN 'pending' ELSE 'collected' END::collectionstatus "
+            "FROM generate_series(1, :rows) AS g"
+        ), {"user_id": user_id, "first": first, "end": end, "rows": rows})
+        conn.execute(text(
+            "UPDATE collections SET status = 'pending' WHERE date >= :start AND status = 'collected' "
+            "AND id % 2 = 0"
+        ), {"start": partitioning.month_start(today)})
+    with engine.connect() as conn:
+        conn.execution_options(isolation_level="AUTOCOMMIT").execute(text("ANALYZE collections"))
+
+
+def _scanned_relations(plan: dict) -> set:
+    relations = set()
+    if "Relation Name" in plan:
+        relations.add(plan["Relation Name"])
+    for child in plan.get("Plans", []):
+        relations |= _scanned_relations(child)
+    return relations
+
+
+def bench(repeat: int) -> None:
+    start = partitioning.month_start(date.today())
+    params = {"start": start, "end": partitioning.add_months(start, 1)}
+    with engine.connect() as conn:
+        total = conn.execute(text("SELECT count(*) FROM collections")).scalar()
+        partitions = len(partitioning.list_partitions(conn))
+        planning, execution = [], []
+        for _ in range(repeat):
+            result = conn.execute(text("EXPLAIN (ANALYZE, FORMAT JSON) " + HOT_QUERY), params).scalar()
+            explain = (json.loads(result) if isinstance(result, str) else result)[0]
+            planning.append(explain["Planning Time"])
+            execution.append(explain["Execution Time"])
+        scanned = sorted(_scanned_relations(explain["Plan"]))
+
+    print(f"{total} coletas em {partitions} partições mensais")
+    print(f"Consulta: coletas pendentes de {start:%Y-%m}")
+    print(f"Partições acessadas: {len(scanned)} ({', '.join(scanned)})")
+    print(f"Planejamento: {statistics.median(planning):.2f} ms (mediana de {repeat})")
+    print(f"Execução:     {statistics.median(execution):.2f} ms (mediana de {repeat})")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=2_000_000)
+    parser.add_argument("--months", type=int, default=24)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--skip-seed", action="store_true")
+    args = parser.parse_args()
+
+    if not args.skip_seed:
+        seed(args.rows, args.months)
+    bench(args.repeat)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,27 @@
+"""
+Mede o custo por requisição do rate limiter em memória.
+
+Uso:
+    python -m benchmarks.bench_rate_limit
+"""
+import time
+
+from app.core.rate_limit import MemoryStore, TokenBucket
+
+N = 200_000
+
+
+def main() -> None:
+    bucket = TokenBucket("bench", capacity=N, period=60, store=MemoryStore())
+    identities = [f"ip:10.0.{i // 256}.{i % 256}" for i in range(1024)]
+
+    start = time.perf_counter()
+    for i in range(N):
+        bucket.hit(identities[i & 1023])
+    elapsed = time.perf_counter() - start
+
+    print(f"{N} hits em {elapsed:.3f}s -> {elapsed / N * 1e6:.2f} us/hit")
+
+
+if __name__ == "__main__":
+    main()
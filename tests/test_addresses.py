@@ -0,0 +1,43 @@
+from app.utils.addresses import AddressIndex, CanonicalAddress, canonicalize, trigrams
+
+
+def test_canonicalize_splits_street_numbers_and_locality():
+    assert canonicalize("R. das Flores, nº 100 - Centro, Curitiba - PR, CEP 80010-000") == CanonicalAddress(
+        "rua", "flores", "100", frozenset({"centro", "curitiba", "pr"})
+    )
+
+
+def test_canonicalize_normalizes_accents_and_abbreviations():
+    assert canonicalize("AV. Dr. Arnaldo 455") == canonicalize("Avenida Doutor Arnaldo, n. 455")
+    assert canonicalize("Praça da Sé s/n") == CanonicalAddress("praca", "se", "", frozenset())
+
+
+def test_trigrams_pad_each_word_like_pg_trgm():
+    assert sorted(trigrams("se")) == ["  s", " se", "se "]
+    assert len(trigrams("rua rua")) == 4
+
+
+def _index():
+    index = AddressIndex(threshold=0.6, conflict_meters=250, refresh_seconds=60, rebuild_seconds=3600)
+    index.add("Rua das Flores, 100 - Centro, Curitiba - PR", -25.43, -49.27)
+    index.add("Avenida Sete de Setembro, 2500 - Centro, Curitiba - PR", -25.44, -49.28)
+    return index
+
+
+def test_lookup_matches_alternative_spellings():
+    index = _index()
+    match = index.lookup("r. das flores nº 100")
+    assert (match.latitude, match.longitude) == (-25.43, -49.27)
+    assert match.similarity == 1.0
+    assert index.lookup("Av. Sete de Setembru, 2500 - Centro").latitude == -25.44
+
+
+def test_lookup_rejects_other_street_in_same_locality():
+    assert _index().lookup("Rua das Rosas, 100 - Centro, Curitiba - PR") is None
+
+
+def test_lookup_rejects_other_number_type_or_locality():
+    index = _index()
+    assert index.lookup("Rua das Flores, 101 - Centro") is None
+    assert index.lookup("Avenida das Flores, 100") is None
+    assert index.lookup("Rua das Flores, 100 - Batel, Curitiba") is None
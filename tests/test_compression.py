@@ -0,0 +1,21 @@
+from app.core.compression import CompressedBody, PrecompressedResponse, etag_matches, variant_etag
+
+BODY = b'[{"name": "Cooperativa"}]' * 100
+
+
+def test_each_encoding_has_its_own_etag():
+    assert variant_etag("1-2", "") == '"1-2"'
+    assert variant_etag("1-2", "gzip") == '"1-2-gzip"'
+
+
+def test_response_etag_matches_variant_etag():
+    response = PrecompressedResponse(CompressedBody(BODY), "gzip", etag="1-2")
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == variant_etag("1-2", "gzip")
+
+
+def test_etag_matches_lists_and_weak_tags():
+    assert etag_matches('"a", W/"1-2-gzip"', '"1-2-gzip"')
+    assert etag_matches("*", '"1-2"')
+    assert not etag_matches('"1-2"', '"1-2-gzip"')
+    assert not etag_matches(None, '"1-2"')
@@ -0,0 +1,106 @@
+from datetime import datetime, time
+
+from sqlalchemy.dialects import postgresql
+
+from app.crud import crud_slot
+from app.models.collection import Collection, CollectionStatus
+from app.models.collection_slot import CollectionSlot
+
+
+class _Result:
+    def __init__(self, row):
+        self._row = row
+
+    def first(self):
+        return self._row
+
+
+class FakeSession:
+    """
+    Registra os comandos executados, simulando o retorno do `RETURNING`.
+
+    `full` lista as janelas lotadas; `counters` são as linhas de `collection_slots` do dia.
+    """
+
+    def __init__(self, booked: bool = True, full=(), counters=()):
+        self.booked = booked
+        self.full = set(full)
+        self.counters = list(counters)
+        self.statements = []
+
+    def execute(self, stmt):
+        self.statements.append(stmt)
+        booked = self.booked and _params(stmt)["slot_start"] not in self.full
+        return _Result((1,) if booked else None)
+
+    def query(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def all(self):
+        return self.counters
+
+
+def _params(stmt) -> dict:
+    return stmt.compile(dialect=postgresql.dialect()).params
+
+
+def test_book_counts_status_column():
+    db = FakeSession()
+    assert crud_slot.book(db, zone="1:2", day=datetime(2024, 11, 26).date(), slot_start=time(10, 0),
+                          status=CollectionStatus.collected)
+    params = _params(db.statements[0])
+    assert params["pending"] == 0
+    assert params["collected"] == 1
+
+
+def test_book_returns_false_when_slot_is_full():
+    db = FakeSession(booked=False)
+    assert not crud_slot.book(db, zone="1:2", day=datetime(2024, 11, 26).date(), slot_start=time(10, 0))
+
+
+def test_book_collection_sets_zone_and_slot():
+    db = FakeSession()
+    collection = Collection(date=datetime(2024, 11, 26), latitude=-23.55, longitude=-46.63,
+                            window_start=time(10, 30), status=CollectionStatus.pending)
+    assert crud_slot.book_collection(db, collection)
+    assert collection.zone is not None
+    assert collection.slot_start == time(10, 0)
+    assert _params(db.statements[0])["pending"] == 1
+
+
+def test_book_collection_skips_unscheduled():
+    db = FakeSession()
+    collection = Collection(date=datetime(2024, 11, 26), latitude=-23.55, longitude=-46.63, window_start=None)
+    assert crud_slot.book_collection(db, collection)
+    assert collection.zone is None
+    assert db.statements == []
+
+
+def _morning_collection():
+    return Collection(date=datetime(2024, 11, 26), latitude=-23.55, longitude=-46.63,
+                      window_start=time(8, 0), window_end=time(12, 0), status=CollectionStatus.pending)
+
+
+def test_book_collection_spreads_period_over_least_booked_slot():
+    db = FakeSession(counters=[CollectionSlot(slot_start=time(8, 0), pending=5, collected=0)])
+    collection = _morning_collection()
+    assert crud_slot.book_collection(db, collection)
+    assert collection.slot_start == time(10, 0)
+
+
+def test_book_collection_tries_next_slot_of_period_when_full():
+    db = FakeSession(full=[time(8, 0)])
+    collection = _morning_collection()
+    assert crud_slot.book_collection(db, collection)
+    assert collection.slot_start == time(10, 0)
+    assert len(db.statements) == 2
+
+
+def test_book_collection_fails_when_every_slot_of_period_is_full():
+    db = FakeSession(full=[time(8, 0), time(10, 0)])
+    collection = _morning_collection()
+    assert not crud_slot.book_collection(db, collection)
+    assert collection.zone is None
@@ -0,0 +1,93 @@
+from app.utils.heatmap import CollectionSnapshot, aggregate
+
+BBOX = (-47.0, -24.0, -46.0, -23.0)
+
+
+def _snapshot():
+    snapshot = CollectionSnapshot(refresh_seconds=60, rebuild_seconds=3600)
+    snapshot._append(1, -23.55, -46.63, [
+        {"material": "papel", "quantity": 2, "unity": "kg"},
+        {"material": "papel", "quantity": 3, "unity": "kg"},
+    ])
+    snapshot._append(2, -23.55, -46.63, [
+        {"material": "papel", "quantity": 1, "unity": "kg"},
+        {"material": "vidro", "quantity": 4, "unity": "kg"},
+    ])
+    snapshot._append(3, -23.55, -46.63, [{"material": "metal", "quantity": 1, "unity": "kg"}])
+    return snapshot
+
+
+def test_aggregate_counts_collections():
+    points, items, materials = _snapshot().arrays()
+    (cell,) = aggregate(points, items, materials, BBOX, cell_size=1.0)
+    assert cell["count"] == 3
+    assert cell["kg"] == {"papel": 6.0, "vidro": 4.0, "metal": 1.0}
+
+
+def test_material_filter_counts_each_collection_once():
+    points, items, materials = _snapshot().arrays()
+    (cell,) = aggregate(points, items, materials, BBOX, cell_size=1.0, material="papel")
+    assert cell["count"] == 2
+    assert cell["kg"] == {"papel": 6.0}
+
+
+def test_add_does_not_skip_rows_from_other_processes():
+    snapshot = CollectionSnapshot(refresh_seconds=60, rebuild_seconds=3600)
+
+    class Local:
+        id, latitude, longitude, materials, change_seq = 10, -23.5, -46.6, [], 99
+
+    snapshot.add(Local())
+    assert snapshot._state.watermark == 0
+
+
+class _Row:
+    def __init__(self, id, latitude=-23.55, longitude=-46.63, materials=()):
+        self.id, self.latitude, self.longitude, self.materials = id, latitude, longitude, list(materials)
+
+
+class _RebuildSession:
+    """Sessão falsa: devolve `rows` e, durante a leitura, simula um `add` de outra requisição."""
+
+    def __init__(self, snapshot, rows, concurrent):
+        self.snapshot, self.rows, self.concurrent = snapshot, rows, concurrent
+
+    def execute(self, *args):
+        return self
+
+    def scalar(self):
+        return 100
+
+    def query(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def yield_per(self, n):
+        self.snapshot.add(self.concurrent)
+        return iter(self.rows)
+
+
+def test_rebuild_swaps_state_and_keeps_concurrent_adds():
+    snapshot = CollectionSnapshot(refresh_seconds=60, rebuild_seconds=3600)
+    snapshot._append(1, -23.55, -46.63, [])
+    snapshot.refresh(_RebuildSession(snapshot, [_Row(2), _Row(3)], concurrent=_Row(4)))
+
+    points, _, _ = snapshot.arrays()
+    assert snapshot._state.ids == {2, 3, 4}
+    assert len(points) == 3
+    assert snapshot._state.watermark == 100
+    assert snapshot._replay is None
+
+
+def test_heatmap_rejects_non_finite_bbox():
+    from fastapi.testclient import TestClient
+
+    from app.main import app
+
+    client = TestClient(app)
+    for bbox in ("nan,0,1,1", "0,0,inf,1", "200,0,300,1"):
+        assert client.get("/api/v1/collections/heatmap", params={"bbox": bbox}).status_code == 400
+    response = client.get("/api/v1/collections/heatmap", params={"bbox": "-1e308,-90,1e308,90", "zoom": 0})
+    assert response.status_code == 200
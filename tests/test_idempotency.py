@@ -0,0 +1,243 @@
+import operator
+import threading
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.sql import operators
+
+from app.core.idempotency import IdempotencyStore
+from app.models.idempotency_key import IdempotencyKey
+
+_COLUMNS = ("key", "request_hash", "status_code", "response", "locked_until", "expires_at")
+_OPERATORS = {
+    operators.eq: operator.eq, operators.ne: operator.ne, operators.lt: operator.lt,
+    operators.le: operator.le, operators.gt: operator.gt, operators.ge: operator.ge,
+    operators.is_: operator.is_, operators.is_not: operator.is_not,
+}
+
+
+class Table:
+    """Linhas confirmadas de `idempotency_keys`, compartilhadas entre sessões (processos)."""
+
+    def __init__(self):
+        self.rows = {}
+        self.lock = threading.Lock()
+
+
+class FakeQuery:
+    def __init__(self, session, criteria=()):
+        self.session = session
+        self.criteria = criteria
+
+    def filter(self, *criteria):
+        return FakeQuery(self.session, self.criteria + criteria)
+
+    def _matches(self):
+        for row in self.session._visible():
+            if all(_OPERATORS[c.operator](getattr(row, c.left.key), getattr(c.right, "value", None))
+                   for c in self.criteria):
+                yield row
+
+    def first(self):
+        return next(self._matches(), None)
+
+    def update(self, values, synchronize_session=None):
+        rows = list(self._matches())
+        for row in rows:
+            for column, value in values.items():
+                setattr(row, column.key, value)
+            self.session.local[row.key] = row
+        return len(rows)
+
+    def delete(self, synchronize_session=None):
+        rows = list(self._matches())
+        for row in rows:
+            self.session.delete(row)
+        return len(rows)
+
+
+class FakeSession:
+    """
+    Simula uma sessão em read committed sobre uma `Table`: as alterações ficam locais até o
+    `commit`, que aplica a restrição única de `key`.
+    """
+
+    def __init__(self, table: Table):
+        self.table = table
+        self.local = {}  # key -> linha alterada nesta transação (None se excluída)
+        self.inserted = set()
+        self.queries = 0
+
+    def _visible(self):
+        # Cada leitura vê as linhas confirmadas mais recentes, exceto as alteradas nesta transação
+        with self.table.lock:
+            rows = {key: SimpleNamespace(**vars(row)) for key, row in self.table.rows.items()}
+        rows.update(self.local)
+        return [row for row in rows.values() if row is not None]
+
+    def query(self, model):
+        assert model is IdempotencyKey
+        self.queries += 1
+        return FakeQuery(self)
+
+    def add(self, obj):
+        self.local[obj.key] = SimpleNamespace(**{c: getattr(obj, c) for c in _COLUMNS})
+        self.inserted.add(obj.key)
+
+    def delete(self, row):
+        self.local[row.key] = None
+
+    def expire(self, row):
+        pass
+
+    def commit(self):
+        with self.table.lock:
+            duplicate = any(key in self.table.rows for key in self.inserted)
+            if not duplicate:
+                for key, row in self.local.items():
+                    if row is None:
+                        self.table.rows.pop(key, None)
+                    else:
+                        self.table.rows[key] = row
+        self.local, self.inserted = {}, set()
+        if duplicate:
+            raise IntegrityError("INSERT", {}, Exception("duplicate key"))
+
+    def rollback(self):
+        self.local, self.inserted = {}, set()
+
+
+def _store(**kwargs):
+    options = {"ttl_seconds": 3600, "wait_seconds": 0.3, "lock_seconds": 60}
+    options.update(kwargs)
+    return IdempotencyStore(**options)
+
+
+def _create(store, db, key="k1", payload=None, body=None):
+    with store.begin(db, "users:a@example.com", key, payload or {"name": "Ana"}) as request:
+        if request.replay is not None:
+            return request.replay
+        request.save(201, body or {"id": 1})
+    return None
+
+
+def _hash_of(payload):
+    table = Table()
+    _create(_store(), FakeSession(table), key="probe", payload=payload)
+    return table.rows["users:a@example.com:probe"].request_hash
+
+
+def test_repeat_is_replayed_from_memory_cache():
+    store, db = _store(), FakeSession(Table())
+    assert _create(store, db) is None
+    queries = db.queries
+    replay = _create(store, db)
+    assert replay.status_code == 201
+    assert replay.headers["Idempotent-Replayed"] == "true"
+    assert db.queries == queries
+
+
+def test_repeat_in_another_process_is_replayed_from_database():
+    table = Table()
+    assert _create(_store(), FakeSession(table)) is None
+    replay = _create(_store(), FakeSession(table))
+    assert replay.status_code == 201
+    assert table.rows["users:a@example.com:k1"].locked_until is None
+
+
+@pytest.mark.parametrize("same_process", [True, False])
+def test_same_key_with_different_body_is_rejected(same_process):
+    table = Table()
+    store = _store()
+    _create(store, FakeSession(table))
+    with pytest.raises(HTTPException) as exc:
+        _create(store if same_process else _store(), FakeSession(table), payload={"name": "Bia"})
+    assert exc.value.status_code == 422
+
+
+def test_in_progress_key_in_another_process_returns_conflict():
+    table, store = Table(), _store()
+    now = datetime.now(timezone.utc)
+    table.rows["users:a@example.com:k1"] = SimpleNamespace(
+        key="users:a@example.com:k1", request_hash=_hash_of({"name": "Ana"}), status_code=None,
+        response=None, locked_until=now + timedelta(seconds=60), expires_at=now + timedelta(hours=1),
+    )
+    with pytest.raises(HTTPException) as exc:
+        _create(store, FakeSession(table))
+    assert exc.value.status_code == 409
+    assert "still being processed" in exc.value.detail
+
+
+def test_abandoned_key_is_reclaimed_after_lease():
+    table = Table()
+    store = _store()
+    now = datetime.now(timezone.utc)
+    table.rows["users:a@example.com:k1"] = SimpleNamespace(
+        key="users:a@example.com:k1", request_hash=_hash_of({"name": "Ana"}), status_code=None,
+        response=None, locked_until=now - timedelta(seconds=1), expires_at=now + timedelta(hours=1),
+    )
+    assert _create(store, FakeSession(table), body={"id": 7}) is None
+    row = table.rows["users:a@example.com:k1"]
+    assert (row.status_code, row.response) == (201, {"id": 7})
+
+
+def test_failed_request_releases_key():
+    table, store = Table(), _store()
+    with pytest.raises(HTTPException):
+        with store.begin(FakeSession(table), "users:a@example.com", "k1", {"name": "Ana"}):
+            raise HTTPException(status_code=400, detail="Email already registered")
+    assert table.rows == {}
+    assert store._inflight == {}
+    assert _create(store, FakeSession(table)) is None
+
+
+def _wait_for_owner(store, db, outcome):
+    """Inicia uma requisição dona da chave e devolve `(thread, liberar)`; `outcome` decide o fim."""
+    started, release = threading.Event(), threading.Event()
+
+    def owner():
+        try:
+            with store.begin(db, "users:a@example.com", "k1", {"name": "Ana"}) as request:
+                started.set()
+                release.wait(5)
+                if outcome == "fail":
+                    raise HTTPException(status_code=400, detail="Email already registered")
+                request.save(201, {"id": 1})
+        except HTTPException:
+            pass
+
+    thread = threading.Thread(target=owner)
+    thread.start()
+    started.wait(5)
+    return thread, release
+
+
+def test_concurrent_duplicate_waits_for_original_response():
+    table, store = Table(), _store(wait_seconds=5)
+    thread, release = _wait_for_owner(store, FakeSession(table), "save")
+    threading.Timer(0.05, release.set).start()
+    replay = _create(store, FakeSession(table))
+    thread.join()
+    assert replay.status_code == 201
+
+
+def test_concurrent_duplicate_of_failed_request_gets_retryable_error():
+    table, store = Table(), _store(wait_seconds=5)
+    thread, release = _wait_for_owner(store, FakeSession(table), "fail")
+    threading.Timer(0.05, release.set).start()
+    with pytest.raises(HTTPException) as exc:
+        _create(store, FakeSession(table))
+    thread.join()
+    assert exc.value.status_code == 409
+    assert "failed; retry" in exc.value.detail
+
+
+def test_purge_expired_removes_only_expired_keys():
+    table, store = Table(), _store()
+    _create(store, FakeSession(table), key="fresh")
+    _create(_store(ttl_seconds=-1), FakeSession(table), key="old")
+    assert store.purge_expired(FakeSession(table)) == 1
+    assert list(table.rows) == ["users:a@example.com:fresh"]
@@ -0,0 +1,41 @@
+import time
+
+import pytest
+
+from app.core.rate_limit import MemoryStore, RedisStore, TokenBucket
+
+
+def test_acquire_waits_for_a_token():
+    bucket = TokenBucket("geocoder", capacity=1, period=0.05, store=MemoryStore())
+    assert bucket.acquire("nominatim", timeout=1)
+    start = time.monotonic()
+    assert bucket.acquire("nominatim", timeout=1)
+    assert time.monotonic() - start >= 0.04
+
+
+def test_acquire_gives_up_after_timeout():
+    bucket = TokenBucket("geocoder", capacity=1, period=10, store=MemoryStore())
+    assert bucket.acquire("nominatim", timeout=0)
+    assert not bucket.acquire("nominatim", timeout=0.1)
+
+
+def test_redis_store_falls_back_to_memory_when_unreachable():
+    pytest.importorskip("redis")
+    store = RedisStore("redis://127.0.0.1:1/0")
+    assert store.consume("login:ip:1", capacity=1, rate=0.1) == (True, 0.0)
+    allowed, retry_after = store.consume("login:ip:1", capacity=1, rate=0.1)
+    assert not allowed and retry_after > 0
+
+
+def test_redis_store_skips_redis_until_retry_deadline():
+    pytest.importorskip("redis")
+    store = RedisStore("redis://127.0.0.1:1/0")
+    store.consume("login:ip:1", capacity=5, rate=1)
+    assert store._retry_at is not None
+
+    def unreachable(*args, **kwargs):
+        raise AssertionError("Redis consultado antes do prazo de nova tentativa")
+
+    store._script = unreachable
+    allowed, _ = store.consume("login:ip:1", capacity=5, rate=1)
+    assert allowed
@@ -0,0 +1,72 @@
+import threading
+
+from sqlalchemy.exc import IntegrityError
+
+from app.core.revocation import RevocationList
+
+
+class FakeSession:
+    """Simula a restrição única de `revoked_tokens.jti`."""
+
+    def __init__(self):
+        self.stored = set()
+        self.pending = []
+
+    def add(self, obj):
+        self.pending.append(obj.jti)
+
+    def commit(self):
+        jti = self.pending.pop()
+        if jti in self.stored:
+            raise IntegrityError("INSERT", {}, Exception("duplicate key"))
+        self.stored.add(jti)
+
+    def rollback(self):
+        self.pending.clear()
+
+
+def test_revoke_reports_first_use_only():
+    revocations = RevocationList(sync_interval=30)
+    db = FakeSession()
+    assert revocations.revoke(db, "abc", exp=None)
+    assert not revocations.revoke(db, "abc", exp=None)
+    assert revocations.is_revoked("abc")
+
+
+def test_revoke_checks_database_not_memory():
+    # Outro processo já revogou o token, mas este ainda não sincronizou a lista
+    db = FakeSession()
+    db.stored.add("abc")
+    revocations = RevocationList(sync_interval=30)
+    assert not revocations.is_revoked("abc")
+    assert not revocations.revoke(db, "abc", exp=None)
+
+
+class SlowSyncSession(FakeSession):
+    """Durante a leitura da lista, outra requisição revoga um token (em outra thread)."""
+
+    def __init__(self, revocations):
+        super().__init__()
+        self.revocations = revocations
+        self.revoker = None
+
+    def query(self, *args):
+        return self
+
+    def filter(self, *args):
+        return self
+
+    def all(self):
+        snapshot = []  # Lido antes da revogação concorrente
+        self.revoker = threading.Thread(target=self.revocations.revoke, args=(FakeSession(), "abc", None))
+        self.revoker.start()
+        self.revoker.join(0.2)
+        return snapshot
+
+
+def test_sync_does_not_drop_concurrent_revocation():
+    revocations = RevocationList(sync_interval=30)
+    db = SlowSyncSession(revocations)
+    revocations.sync(db)
+    db.revoker.join()
+    assert revocations.is_revoked("abc")
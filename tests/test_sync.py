@@ -0,0 +1,33 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.api_v1.endpoints.sync import SyncToken, _parse_token
+from app.core.config import settings
+
+NOW = 1_700_000_000
+
+
+def test_parse_token_defaults_to_full_sync():
+    assert _parse_token(None, NOW) == SyncToken(0, 0, NOW, False)
+    assert _parse_token("", NOW) == SyncToken(0, 0, NOW, False)
+
+
+def test_parse_token_reads_position():
+    assert _parse_token(f"1042:77:{NOW - 60}", NOW) == SyncToken(1042, 77, NOW - 60, False)
+
+
+@pytest.mark.parametrize("token", ["77", "1042:77"])
+def test_parse_legacy_token_resets_sync(token):
+    assert _parse_token(token, NOW) == SyncToken(0, 0, NOW, True)
+
+
+def test_parse_token_older_than_tombstone_retention_resets_sync():
+    issued = NOW - settings.TOMBSTONE_RETENTION_DAYS * 86400 - 1
+    assert _parse_token(f"1042:77:{issued}", NOW) == SyncToken(0, 0, NOW, True)
+
+
+@pytest.mark.parametrize("token", ["abc:1", "1:-2", "-1:3", "1:x", "1:2:3:4", "1:2:-3"])
+def test_parse_token_rejects_invalid(token):
+    with pytest.raises(HTTPException) as exc:
+        _parse_token(token, NOW)
+    assert exc.value.status_code == 400